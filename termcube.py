@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import atexit
+import random
 import re
 import time
 import sys
@@ -8,6 +10,9 @@ from argparse import ArgumentParser, Namespace, RawDescriptionHelpFormatter
 from termcube import cube, skewb, simulator, TurnSequence 
 from termcube.termusr import prompt_number, prompt_int, prompt_ln, timer
 from termcube.scrambler import ScrambleGenerator
+from termcube.cube.scramble import ScrambleFilter
+from termcube.cube.subsets import subsets
+from termcube.cube.solutioncache import SolutionCache
 
 epilog_text = \
 """possible behaviours:
@@ -16,12 +21,16 @@ simulator       - simulate a cube of any side length > 0
 demo-kociemba   - random-state scramble then solve a cube with
                   Kociemba's two-phase algorithm, turn by turn
 random-turns    - Start from solved, then apply random turns until solved
+build-tables    - rebuild the move and pruning tables of the two-phase
+                  algorithm and print how long each one took
+bench           - time solves and scrambles of fixed seeded corpora of
+                  3x3x3 states, optionally writing the results as JSON
 """
 
 parser = ArgumentParser(epilog = epilog_text, formatter_class = RawDescriptionHelpFormatter)
 
 parser.add_argument('behaviour', nargs='?', default='timer', type=str,
-            help='timer, simulator, demo-kociemba, random-turns')
+            help='timer, simulator, demo-kociemba, random-turns, build-tables, bench')
 
 parser.add_argument('puzzle', nargs='?', default='3', type=str,
             help="Puzzle type -- either 'skewb' or a cube side length (default 3)")
@@ -29,12 +38,46 @@ parser.add_argument('puzzle', nargs='?', default='3', type=str,
 parser.add_argument('--inspection', '-i', default=15.0, type=float,
             help='The number of seconds to inspect (default 15)')
 
+parser.add_argument('--refresh', '-r', default=0.01, type=float,
+            help='The number of seconds between updates of the timer without curses (default 0.01)')
+
 parser.add_argument('--unofficial', '-u', nargs='?', type=int, default=None, const=-1,
             help='Use a low CPU alternative to official style scrambles')
 
 parser.add_argument('--nocurses', '-n', action='store_true',
             help='Low-dependency alternative to the usual display settings')
 
+parser.add_argument('--min-length', '-m', default=0, type=int,
+            help='Reject 3x3x3 random state scrambles whose solution found is shorter than this, '
+                 'or 2x2x2 ones closer to solved than this, at most %d (default 0)' % cube.pocket.MAX_DISTANCE)
+
+parser.add_argument('--min-phase1', default=0, type=int,
+            help='Reject 3x3x3 random states proven to be fewer than this many moves from the phase 2 '
+                 'subgroup, and so from solved (default 0)')
+
+parser.add_argument('--subset', '-s', default='random', choices=sorted(subsets),
+            help='Draw 3x3x3 random state scrambles from this subset (default random)')
+
+parser.add_argument('--processes', '-p', default=1, type=int,
+            help='Split each 3x3x3 solve across this many processes, 0 for one per CPU (default 1)')
+
+parser.add_argument('--count', '-c', default=20, type=int,
+            help='Number of states in each bench corpus (default 20)')
+
+parser.add_argument('--seed', default=None, type=int,
+            help='Seed of the scrambles, which are then the same every run, and of the bench corpora '
+                 '(default unseeded scrambles and bench seed 0)')
+
+parser.add_argument('--json', '-j', default=None, type=str,
+            help='Write the bench results to this JSON file')
+
+parser.add_argument('--solution-cache', default=None, type=str,
+            help='Keep 3x3x3 solutions in this file across runs')
+
+parser.add_argument('--verbose', '-v', action='store_true',
+            help='Print how many random states the scramble filter accepted, rejected and searched '
+                 'again, and how fast, on exit')
+
 def prompt_args():
     print('1. Timer')
     print('2. Simulator Interactive Mode')
@@ -80,7 +123,14 @@ def prompt_args():
         options.nocurses = not prompt_ln("Use curses? (y/n) (default yes): ", default='y').startswith('y')
     
     options.inspection = 15.0
+    options.refresh = 0.01
     options.unofficial = -1
+    options.min_length = 0
+    options.min_phase1 = 0
+    options.subset = 'random'
+    options.processes = 1
+    options.solution_cache = None
+    options.seed = None
     return options
 
 def main():
@@ -100,6 +150,27 @@ def main():
         except:
             print("Puzzle type %s not applicable. Exiting." % options.puzzle)
             sys.exit(0)
+
+    if getattr(options.puzzle, 'size', None) == 2 and options.min_length > cube.pocket.MAX_DISTANCE:
+        print("No 2x2x2 state is more than %d moves from solved. Exiting." % cube.pocket.MAX_DISTANCE)
+        sys.exit(0)
+
+    if (options.min_length > 0 or options.min_phase1 > 0 or options.verbose) and hasattr(options.puzzle, 'scramble_filter'):
+        options.puzzle.scramble_filter = ScrambleFilter(minPhase1 = options.min_phase1, minLength = options.min_length)
+        if options.verbose:
+            atexit.register(lambda: print('Scramble filter: %s' % options.puzzle.scramble_filter, file=sys.stderr))
+
+    if hasattr(options.puzzle, 'subset'):
+        options.puzzle.subset = options.subset
+
+    if hasattr(options.puzzle, 'processes'):
+        options.puzzle.processes = options.processes or None
+
+    if options.solution_cache and hasattr(options.puzzle, 'solution_cache'):
+        options.puzzle.solution_cache = SolutionCache(path = options.solution_cache)
+
+    if options.seed is not None:
+        options.puzzle.rng = random.Random(options.seed)
     
     """Regarding the value of options.unofficial:
     if using a random state scramble, options.unofficial is None
@@ -111,7 +182,8 @@ def main():
               options.inspection, 
               random = options.unofficial == None,
               length = options.unofficial if options.unofficial else -1,
-              nocurses = options.nocurses)
+              nocurses = options.nocurses,
+              refresh = options.refresh)
     elif options.behaviour == 'simulator':
         simulator.simulate(options.puzzle, options.nocurses)
     elif options.behaviour == 'demo-kociemba':
@@ -135,6 +207,19 @@ def main():
             if r.is_solved():
                 break
         print('WOAH')
+    elif options.behaviour == 'build-tables':
+        from termcube.cube.pykociemba import coordcube
+        print('Building tables %s NumPy' % ('with' if coordcube.numpy else 'without'))
+        total = 0
+        for name, seconds in coordcube.buildTables():
+            print('%-28s %8.2f s' % (name, seconds))
+            total += seconds
+        print('%-28s %8.2f s' % ('total', total))
+    elif options.behaviour == 'bench':
+        from termcube.cube import bench
+        results = bench.run(options.count, options.seed or 0, report = print)
+        if options.json:
+            bench.dump(results, options.json)
     else:
         parser.print_help()
 
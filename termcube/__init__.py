@@ -1,3 +1,6 @@
+from array import array
+import random
+
 class TurnSequence(list):
     """Represent a sequence of Turns.
     """
@@ -27,6 +30,42 @@ class TurnSequence(list):
         """Return an HTML safe representation of this TurnSequence"""
         return map(''.join(self).replace('\'', '%27'))
 
+    def to_bytes(self):
+        """Return this TurnSequence as bytes, each Turn a varint of its
+        depth, move and direction. Any Turn of a 3x3x3, or at most two
+        layers deep, takes one byte.
+        """
+        ret = bytearray()
+        for t in self:
+            code = ((getattr(t, 'depth', 0) * len(t.moves) + t.moves.index(t.move)) * len(t.directions)
+                    + t.directions.index(t.direction))
+            while code >= 0x80:
+                ret.append(code & 0x7f | 0x80)
+                code >>= 7
+            ret.append(code)
+        return bytes(ret)
+
+    @classmethod
+    def from_bytes(cls, data, turntype):
+        """Return the TurnSequence of turntype Turns which to_bytes gave data."""
+        turns = []
+        code = shift = 0
+        for b in data:
+            code |= (b & 0x7f) << shift
+            if b & 0x80:
+                shift += 7
+                continue
+            code, direction = divmod(code, len(turntype.directions))
+            depth, move = divmod(code, len(turntype.moves))
+            if depth:
+                turns.append(turntype(turntype.moves[move], turntype.directions[direction], depth))
+            else:
+                turns.append(turntype(turntype.moves[move], turntype.directions[direction]))
+            code = shift = 0
+        if shift:
+            raise ValueError('truncated TurnSequence bytes')
+        return cls(turns)
+
     def __str__(self):
         """Return each Turn in notation as a single str."""
         return ' '.join(map(str, self))
@@ -34,3 +73,64 @@ class TurnSequence(list):
     def __repr__(self):
         """Return this TurnSequence unambiguously"""
         return 'TurnSequence(%s)' % ', '.join(map(str, self))
+
+
+class TurnBatch():
+    """Hold count scrambles of moves random turns each, drawn together.
+    Every turn is kept as the indices of its face, direction and depth
+    in three arrays, and a scramble only becomes a TurnSequence when it
+    is taken out.
+
+    The turns are drawn from faces, directions and depths. follow[f]
+    lists the indices of the faces which may be turned after face f, so
+    every scramble obeys it as drawn, and each scramble is drawn as if
+    it followed a turn of face first. make(face, direction, depth)
+    returns a Turn.
+    """
+    def __init__(self, count, moves, make, faces, directions, depths, follow, first = 0, rng = random):
+        self.count, self.moves, self.make = count, moves, make
+        self.values = (faces, directions, depths)
+
+        # Every turn which may follow each face, as triples of indices
+        choices = [[(f, r, d) for f in allowed for r in range(len(directions)) for d in range(len(depths))]
+                   for allowed in follow]
+        drawn = []
+        draw = rng.random
+        for k in range(count):
+            last = first
+            for m in range(moves):
+                c = choices[last]
+                t = c[int(draw() * len(c))]
+                drawn.append(t)
+                last = t[0]
+        self.faces, self.directions, self.depths = [array('B', [t[i] for t in drawn]) for i in range(3)]
+        self.names = None
+
+    def __len__(self):
+        return self.count
+
+    def _range(self, i):
+        """Return the range of the turns of scramble i in the arrays."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('scramble index out of range')
+        return range(i * self.moves, (i + 1) * self.moves)
+
+    def __getitem__(self, i):
+        """Return scramble i as a TurnSequence."""
+        faces, directions, depths = self.values
+        return TurnSequence([self.make(faces[self.faces[j]], directions[self.directions[j]], depths[self.depths[j]])
+                             for j in self._range(i)])
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def notation(self, i):
+        """Return scramble i in notation as a single str, without making its Turns."""
+        if self.names is None:
+            faces, directions, depths = self.values
+            self.names = [[[str(self.make(f, r, d)) for d in depths] for r in directions] for f in faces]
+        names = self.names
+        return ' '.join(names[self.faces[j]][self.directions[j]][self.depths[j]] for j in self._range(i))
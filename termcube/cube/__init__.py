@@ -15,13 +15,19 @@ cube notation (WCA or SiGN will both work equally) and it will be
 applied to the cube and print itself. Try it, it's very fun.
 '''
 
+from . import pocket
 from . import scramble
 from . import solve
+from . import subsets
+from . import solutioncache
+from .pykociemba.color import colors
+from .pykociemba.facecube import faceletsToCubieCube
 from .turn import Turn
 from .. import TurnSequence
 
+from random import Random
 from sys import stderr
-from time import sleep, time
+from time import sleep
 
 help_text = \
 """Term Cube Simulator Interactive Mode
@@ -58,9 +64,17 @@ class Cube:
 
     turn_type = Turn
 
+    # Scrambles are drawn from rng. Every Cube shares this one until it is
+    # given its own, which a seeded random.Random must be.
+    rng = Random()
+
     def __init__(self, size = 3):
         """Initialize a Cube with a given dimension in a solved state."""
         self.size = size
+        self.scramble_filter = None
+        self.subset = 'random'
+        self.processes = 1
+        self.solution_cache = solutioncache.default if size == 3 else None
         self.reset()
         if size <= 1:
             self.default_moves = 0
@@ -83,28 +97,37 @@ class Cube:
         return s
 
     def random_scramble(self):
-        return scramble.scramble()
+        """Generate and return a random state scramble without applying,
+        or a random turn one for sizes which have none.
+        """
+        return self.get_scramble(True)
 
     def get_scramble(self, random = True, moves = None):
-        """Generate and return a scramble without applying."""
-        if random and self.size == 3:
-            return scramble.scramble()
+        """Generate and return a scramble without applying.
+        Random state scrambles are drawn from the named subset and passed
+        through scramble_filter if set. All scrambles are drawn from
+        self.rng, so a seeded random.Random repeats them.
+        """
+        if random and self.size == 2:
+            return pocket.scramble(self.scramble_filter, self.rng)
+        elif random and self.size == 3:
+            return subsets.scramble(self.subset, self.scramble_filter, rng = self.rng)
+        elif random and self.size == 4:
+            from . import revenge   # its tables are only loaded once a 4x4x4 needs them
+            return revenge.scramble(self.rng)
         
         if moves is None or moves <= 0:
             moves = self.default_moves
 
-        ret = TurnSequence()
-
-        last = Turn('F')
-        turn = Turn('F')
+        return Turn.random_turns(1, moves, self.size, self.rng)[0]
 
-        for lcv in range(moves):
-            while turn.move == last.move or turn.opposite_face() == last.move:
-                turn = Turn.random_turn(self.size)
-            last = turn
-            ret.append(turn)
-
-        return ret
+    def get_scrambles(self, count, moves = None):
+        """Generate and return a TurnBatch of count random turn
+        scrambles, drawn from self.rng.
+        """
+        if moves is None or moves <= 0:
+            moves = self.default_moves
+        return Turn.random_turns(count, moves, self.size, self.rng)
 
     def apply(self, sequence):
         """Apply a given TurnSequence to this Cube. If a str was given,
@@ -232,28 +255,64 @@ class Cube:
         """Return an ANSI color representation of this Cube"""
         return ''.join(Cube.sticker[f] if f in Cube.sticker else f for f in self.simulatorstr())
 
+    # Place (face, row, column) of every sticker in the order of
+    # kociemba_str, by size. B is read rotated by 180 degrees.
+    kociemba_order = dict()
+
+    @classmethod
+    def sticker_order(cls, size):
+        """Return the places of the stickers of a Cube of a given size in
+        the order of kociemba_str, built on first use.
+        """
+        order = cls.kociemba_order.get(size)
+        if order is None:
+            order = [(f, r, c) for f in 'URFDL' for r in range(size) for c in range(size)]
+            order += [('B', size-1-r, size-1-c) for r in range(size) for c in range(size)]
+            cls.kociemba_order[size] = order
+        return order
+
+    def stickers(self):
+        """Return a list of the stickers of this cube in the order of kociemba_str."""
+        faces = self.faces
+        return [faces[f][r][c] for f, r, c in Cube.sticker_order(self.size)]
+
+    def centers(self):
+        """Return a dict from the sticker of each center to its face."""
+        m = self.size // 2
+        return dict((self.faces[f][m][m], f) for f in 'URFDLB')
+
     def kociemba_str(self):
         """Return this cube in kociemba-friendly sticker format."""
-        ret  = ''.join(''.join(arr) for arr in self.faces['U'])
-        ret += ''.join(''.join(arr) for arr in self.faces['R'])
-        ret += ''.join(''.join(arr) for arr in self.faces['F'])
-        ret += ''.join(''.join(arr) for arr in self.faces['D'])
-        ret += ''.join(''.join(arr) for arr in self.faces['L'])
-        ret += ''.join(''.join(arr) for arr in Cube.rotate_2(self.faces['B']))
+        q = self.centers()
+        return ''.join([q[s] for s in self.stickers()])
 
-        q = dict()
-        for s in 'FRULDB':
-            q[self.color[self.faces[s][1][1]]] = s
-
-        return list(q[Cube.color[s]] for s in ret)
+    def cubie_cube(self, stickers = None):
+        """Return a CubieCube of this 3x3x3 without going through a sticker
+        string. stickers, if given, are those returned by stickers().
+        """
+        q = dict((s, colors[f]) for s, f in self.centers().items())
+        return faceletsToCubieCube([q[s] for s in stickers or self.stickers()])
 
     def solution(self):
-        """Find a solution using Kociemba's two phase algoithm."""
+        """Find a solution using Kociemba's two phase algoithm, split
+        across self.processes processes if more than one. Solutions are
+        remembered in self.solution_cache unless it is None.
+        A 2x2x2 is instead solved optimally from its distance table, and
+        a 4x4x4 is reduced to a 3x3x3 first.
+        """
+        if self.size == 2:
+            return pocket.solve(self)
+        elif self.size == 4:
+            from . import revenge
+            return revenge.solve(self)
         try:
             assert self.size == 3
         except:
             print('Cube must be a 3x3x3 to find a two phase solution', file=stderr)
-        return solve.solve(self.kociemba_str())
+        solver = lambda stickers: solve.solve(self.cubie_cube(stickers), processes = self.processes)
+        if self.solution_cache is None:
+            return solver(self.stickers())
+        return self.solution_cache.solve(self.stickers(), solver)
 
     def __repr__(self):
         """Return an ANSI color representation of the cube."""
@@ -0,0 +1,273 @@
+'''
+##bench.py
+This module benchmarks the two-phase solver and the random-state
+scrambler on fixed corpora of cube states. Every corpus is generated
+from a seed, so two runs with the same seed and count search exactly
+the same states and their results can be compared between versions.
+
+The corpora are random states from scramble.randomstate, last slot
+states from scramble.lastslot, random states from the original
+pykociemba tools.randomCube, and superflip positions, which are the
+superflip followed by random phase 2 moves so that every edge stays
+flipped.
+
+Besides the searches, the conversions of every corpus from a Cube to
+the forms the solver reads are timed and given in conversions per
+second, and so are the getters and setters of the CubieCube
+coordinates, and so are multiplications of CubieCubes by the 18
+moves into a preallocated cube and in place. Lookups of a pruning table are timed through each of the
+ways the table can be read: a NibbleTable entry at a time, many entries
+at once with get_many, and the unpacked bytes which the search reads.
+'''
+
+from .pykociemba.coordcube import load_cachetable
+from .pykociemba.cubiecube import CubieCube, allMoveCube
+from .pykociemba.facecube import FaceCube
+from .pykociemba.search import SearchStats
+from .pykociemba import tools
+from . import scramble as _scramble
+from . import solve as _solve
+from ..stopwatch import Stopwatch
+
+import json
+import platform
+import random
+
+def superflip(rng = random):
+    """Return a CubieCube of the superflip followed by up to 20 random phase 2 moves."""
+    c = CubieCube(eo=[1]*12)
+    for i in range(rng.randrange(21)):
+        axis = rng.randrange(6)
+        c.multiply(allMoveCube[3 * axis + (rng.randrange(3) if axis in (0, 3) else 1)])
+    return c
+
+corpora = {
+    'random': _scramble.randomstate,
+    'lastslot': _scramble.lastslot,
+    'tools': lambda rng: FaceCube(tools.randomCube(rng)).toCubieCube(),
+    'superflip': superflip,
+}
+
+def corpus(name, count, seed):
+    """Return a list of count CubieCubes of the named corpus generated from seed."""
+    rng = random.Random('%s %d' % (name, seed))
+    return [corpora[name](rng) for i in range(count)]
+
+def percentile(values, p):
+    """Return the nearest-rank p-th percentile of a sorted list."""
+    return values[min(len(values) - 1, max(0, -(-len(values) * p // 100) - 1))]
+
+def summarize(times, nodes, lengths, failures):
+    """Return a dict of statistics of the latencies in seconds, nodes and solution lengths of one run."""
+    times = sorted(times)
+    total = sum(times)
+    return {
+        'count': len(times),
+        'failures': failures,
+        'mean': total / len(times) if times else 0.0,
+        'p50': percentile(times, 50) if times else 0.0,
+        'p95': percentile(times, 95) if times else 0.0,
+        'p99': percentile(times, 99) if times else 0.0,
+        'max': times[-1] if times else 0.0,
+        'nodes_per_second': sum(nodes) / total if total else 0.0,
+        'mean_length': sum(lengths) / len(lengths) if lengths else 0.0,
+    }
+
+def benchSolve(cubes, timeOut):
+    """Solve every CubieCube with solve.solve and return the summary."""
+    times, nodes, lengths = [], [], []
+    failures = 0
+    for c in cubes:
+        stats = SearchStats()
+        watch = Stopwatch()
+        res, _ = _solve.solve(c.toFaceCube().to_String(), timeOut = timeOut, stats = stats)
+        times.append(watch.seconds())
+        nodes.append(stats.nodes())
+        if isinstance(res, str):
+            failures += 1
+        else:
+            lengths.append(len(res))
+    return summarize(times, nodes, lengths, failures)
+
+def benchScramble(cubes, timeOut):
+    """Make a scramble of every CubieCube with scramble.scramble and return the summary,
+    with the statistics of its ScrambleFilter, which rejects nothing.
+    A state which times out is searched again without a limit, and counted as a failure.
+    """
+    states = iter(cubes)
+    times, nodes, lengths = [], [], []
+    stats = SearchStats()
+    scrambleFilter = _scramble.ScrambleFilter()
+    for i in range(len(cubes)):
+        searched = stats.nodes()
+        watch = Stopwatch()
+        try:
+            s = _scramble.scramble(lambda rng: next(states), timeOut = timeOut, scrambleFilter = scrambleFilter, stats = stats)
+        except StopIteration:
+            break
+        times.append(watch.seconds())
+        nodes.append(stats.nodes() - searched)
+        lengths.append(len(s))
+    summary = summarize(times, nodes, lengths, stats.searches - stats.solved)
+    summary['filter'] = {
+        'accepted': scrambleFilter.accepted,
+        'rejected': scrambleFilter.rejected(),
+        'retried': scrambleFilter.retried,
+        'scrambles_per_second': scrambleFilter.throughput(),
+    }
+    return summary
+
+modes = {'solve': benchSolve, 'scramble': benchScramble}
+
+def toCube(c):
+    """Return a Cube of size 3 in the state of a CubieCube."""
+    from . import Cube
+    cube = Cube(3)
+    facelets = c.toFaceCube().to_String()
+    for (f, r, q), s in zip(Cube.sticker_order(3), facelets):
+        cube.faces[f][r][q] = s
+    return cube
+
+conversions = {
+    'kociemba_str': lambda cube: cube.kociemba_str(),
+    'cubie_cube': lambda cube: cube.cubie_cube(),
+}
+
+def benchConversions(cubes, repeat = 100):
+    """Convert every CubieCube, as a Cube, repeat times with each of
+    conversions and return a dict of conversions per second.
+    """
+    cubes = [toCube(c) for c in cubes]
+    ret = {}
+    for name, convert in sorted(conversions.items()):
+        watch = Stopwatch()
+        for i in range(repeat):
+            for cube in cubes:
+                convert(cube)
+        t = watch.seconds()
+        ret[name] = repeat * len(cubes) / t if t else 0.0
+    return ret
+
+codecs = ('Twist', 'Flip', 'FRtoBR', 'URFtoDLF', 'URtoDF', 'URtoUL', 'UBtoDF', 'URFtoDLB', 'URtoBR')
+
+def benchCodecs(cubes, repeat = 100):
+    """Get every coordinate of codecs of every CubieCube and set it again
+    repeat times and return a dict of coordinates per second, by name.
+    """
+    ret = {}
+    for name in codecs:
+        get, set = getattr(CubieCube, 'get' + name), getattr(CubieCube, 'set' + name)
+        copies = [CubieCube(c.cp, c.co, c.ep, c.eo) for c in cubes]
+        watch = Stopwatch()
+        for i in range(repeat):
+            for c in copies:
+                set(c, get(c))
+        t = watch.seconds()
+        ret[name] = repeat * len(cubes) / t if t else 0.0
+    return ret
+
+def benchMultiply(cubes, repeat = 100):
+    """Multiply every CubieCube by each of the 18 moves repeat times,
+    into a preallocated cube and in place, and return a dict of
+    multiplications per second, by way.
+    """
+    copies = [CubieCube(c.cp, c.co, c.ep, c.eo) for c in cubes]
+    out = CubieCube()
+    ways = {
+        'out': lambda c, m: c.multiply(m, out),
+        'in_place': lambda c, m: c.multiply(m),
+    }
+    ret = {}
+    for name, multiply in sorted(ways.items()):
+        watch = Stopwatch()
+        for i in range(repeat):
+            for c in copies:
+                for m in allMoveCube:
+                    multiply(c, m)
+        t = watch.seconds()
+        ret[name] = 18 * repeat * len(cubes) / t if t else 0.0
+    return ret
+
+def benchPruning(seed, count = 100000, repeat = 10):
+    """Look up count entries of the flip pruning table, drawn from seed,
+    repeat times in each way it can be read and return a dict of lookups
+    per second, by way.
+    """
+    table = load_cachetable('Slice_Flip_Prun')
+    unpacked = table.unpack()
+    rng = random.Random('pruning %d' % seed)
+    indices = [rng.randrange(len(table)) for i in range(count)]
+
+    def getitem():
+        for i in indices:
+            table[i]
+
+    def bytesitem():
+        for i in indices:
+            unpacked[i]
+
+    ways = {
+        'getitem': getitem,
+        'get_many': lambda: table.get_many(indices),
+        'bytes': bytesitem,
+    }
+    ret = {}
+    for name, lookup in sorted(ways.items()):
+        watch = Stopwatch()
+        for i in range(repeat):
+            lookup()
+        t = watch.seconds()
+        ret[name] = repeat * count / t if t else 0.0
+    return ret
+
+def run(count = 20, seed = 0, names = None, modeNames = None, timeOut = 10, report = None):
+    """Run the benchmark and return its results as a dict.
+    names and modeNames select corpora and modes, all by default. If
+    report is given, it is called with a line of text after every run.
+    """
+    results = {
+        'seed': seed,
+        'count': count,
+        'timeOut': timeOut,
+        'python': platform.python_version(),
+        'results': {},
+        'conversions': {},
+        'codecs': {},
+        'multiply': {},
+    }
+    results['pruning'] = benchPruning(seed)
+    if report is not None:
+        report('%-8s %-9s ' % ('lookup', 'flip') + ' '.join('%s=%.0f/s' % r for r in sorted(results['pruning'].items())))
+    for name in names or sorted(corpora):
+        cubes = corpus(name, count, seed)
+        for mode in modeNames or sorted(modes):
+            summary = modes[mode](cubes, timeOut)
+            results['results'].setdefault(mode, {})[name] = summary
+            if report is not None:
+                report(formatSummary(mode, name, summary))
+                if 'filter' in summary:
+                    report('%-8s %-9s ' % ('filter', name) + ' '.join('%s=%g' % r for r in sorted(summary['filter'].items())))
+        rates = benchConversions(cubes)
+        results['conversions'][name] = rates
+        if report is not None:
+            report('%-8s %-9s ' % ('convert', name) + ' '.join('%s=%.0f/s' % r for r in sorted(rates.items())))
+        rates = benchCodecs(cubes)
+        results['codecs'][name] = rates
+        if report is not None:
+            report('%-8s %-9s ' % ('codec', name) + ' '.join('%s=%.0f/s' % (c, rates[c]) for c in codecs))
+        rates = benchMultiply(cubes)
+        results['multiply'][name] = rates
+        if report is not None:
+            report('%-8s %-9s ' % ('multiply', name) + ' '.join('%s=%.0f/s' % r for r in sorted(rates.items())))
+    return results
+
+def formatSummary(mode, name, summary):
+    """Return a line of text of a summary."""
+    return '%-8s %-9s n=%-3d fail=%-2d mean=%7.1f ms p50=%7.1f p95=%7.1f p99=%7.1f %8.0f nodes/s %5.1f moves' % \
+        (mode, name, summary['count'], summary['failures'], 1000 * summary['mean'], 1000 * summary['p50'],
+         1000 * summary['p95'], 1000 * summary['p99'], summary['nodes_per_second'], summary['mean_length'])
+
+def dump(results, path):
+    """Write results to path as JSON."""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
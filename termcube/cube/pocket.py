@@ -0,0 +1,185 @@
+'''
+##pocket.py
+This module generates random-state scrambles and optimal solutions for
+the 2x2x2 cube. The DBL corner is held fixed so that only U, R and F
+turns are needed, leaving 7! corner permutations times 3^6 corner
+twists, 3674160 states in all. A breadth first search from the solved
+state fills a table with the exact distance of every state, which is
+cached to disk alongside the two-phase tables.
+
+With the distance table, a uniform random state is just a random index
+and an optimal solution is found by repeatedly taking any move that
+lowers the distance by one.
+'''
+
+from .pykociemba.coordcube import load_cachetable, dump_cachetable
+from .pykociemba.cubiecube import CubieCube, allMoveCube
+from .pykociemba.facecube import FaceCube
+from .pykociemba.facelet import D7, B9, L7
+from .scramble import Scramble
+from .turn import Turn
+from .. import TurnSequence
+from ..stopwatch import Stopwatch
+
+import random
+import logging
+
+log = logging.getLogger(__name__)
+
+N_PERM = 5040   # 7! permutations of the corners other than DBL
+N_TWIST = 729   # 3^6 twists of the corners other than DBL, the last one is determined
+N_STATE = N_PERM * N_TWIST
+N_MOVE = 9      # U, R and F with three powers each
+
+# Corner positions which take part in the coordinates. DBL is always solved.
+positions = (0, 1, 2, 3, 4, 5, 7)
+
+move_to_s = [f + d for f in 'URF' for d in ('', '2', '\'')]
+
+def getPerm(cp):
+    """Return the rank of the permutation of the seven corners other than DBL."""
+    perm = [min(cp[i], 6) for i in positions]
+    idx = 0
+    for i in range(7):
+        idx = idx * (7 - i) + sum(1 for j in range(i + 1, 7) if perm[j] < perm[i])
+    return idx
+
+def setPerm(c, idx):
+    """Set the corner permutation of a CubieCube from its rank."""
+    digits = [0]*7
+    for i in range(6, -1, -1):
+        idx, digits[i] = divmod(idx, 7 - i)
+    avail = [0, 1, 2, 3, 4, 5, 7]
+    for i in range(7):
+        c.cp[positions[i]] = avail.pop(digits[i])
+    c.cp[6] = 6
+
+def getTwist(co):
+    """Return the twist of the first six corners. 0 <= twist < 3^6"""
+    ret = 0
+    for i in range(6):
+        ret = 3 * ret + co[i]
+    return ret
+
+def setTwist(c, twist):
+    """Set the corner orientation of a CubieCube from its twist."""
+    for i in range(5, -1, -1):
+        twist, c.co[i] = divmod(twist, 3)
+    c.co[6] = 0
+    c.co[7] = -sum(c.co[:6]) % 3
+
+def _buildMove(n, setter, getter):
+    """Return a move table for the coordinate with the given setter and getter."""
+    table = [[0] * N_MOVE for i in range(n)]
+    a = CubieCube()
+    b = CubieCube()
+    for i in range(n):
+        setter(a, i)
+        for m in range(N_MOVE):
+            a.cornerMultiply(allMoveCube[m], b)
+            table[i][m] = getter(b)
+    return table
+
+log.info('Preparing 2x2x2 move table for the corner permutation')
+permMove = load_cachetable('Pocket_Perm_Move')
+if not permMove:
+    permMove = _buildMove(N_PERM, setPerm, lambda a: getPerm(a.cp))
+    dump_cachetable(permMove, 'Pocket_Perm_Move')
+
+log.info('Preparing 2x2x2 move table for the corner twist')
+twistMove = load_cachetable('Pocket_Twist_Move')
+if not twistMove:
+    twistMove = _buildMove(N_TWIST, setTwist, lambda a: getTwist(a.co))
+    dump_cachetable(twistMove, 'Pocket_Twist_Move')
+
+# Distance table indexed by perm * N_TWIST + twist. Every entry is exact.
+log.info('Preparing 2x2x2 distance table')
+distance = load_cachetable('Pocket_Dist')
+if not distance:
+    distance = bytearray(b'\xff') * N_STATE
+    distance[0] = 0
+    frontier = [0]
+    depth = 0
+    while frontier:
+        log.info('2x2x2 depth %d: %d states', depth, len(frontier))
+        nextFrontier = []
+        for i in frontier:
+            pm = permMove[i // N_TWIST]
+            tm = twistMove[i % N_TWIST]
+            for m in range(N_MOVE):
+                j = pm[m] * N_TWIST + tm[m]
+                if distance[j] == 0xff:
+                    distance[j] = depth + 1
+                    nextFrontier.append(j)
+        frontier = nextFrontier
+        depth += 1
+    dump_cachetable(distance, 'Pocket_Dist')
+
+# The most moves any state is from solved, 11 in the face turn metric
+MAX_DISTANCE = max(distance)
+
+def solution(idx):
+    """Return an optimal solution of the state with the given index as a list of move numbers."""
+    moves = []
+    d = distance[idx]
+    while d > 0:
+        pm = permMove[idx // N_TWIST]
+        tm = twistMove[idx % N_TWIST]
+        for m in range(N_MOVE):
+            j = pm[m] * N_TWIST + tm[m]
+            if distance[j] < d:
+                break
+        moves.append(m)
+        idx = j
+        d -= 1
+    return moves
+
+def toString(moves):
+    """Return a list of move numbers in notation."""
+    return ' '.join(move_to_s[m] for m in moves)
+
+def scramble(scrambleFilter = None, rng = random):
+    """Return a uniformly random state Scramble drawn from rng. If a
+    ScrambleFilter is given, states closer to solved than its minLength
+    are redrawn. A minLength over MAX_DISTANCE, which no state reaches,
+    raises ValueError.
+    """
+    if scrambleFilter is not None and scrambleFilter.minLength > MAX_DISTANCE:
+        raise ValueError('no 2x2x2 state is more than %d moves from solved' % MAX_DISTANCE)
+    watch = Stopwatch()
+    while True:
+        idx = rng.randrange(N_STATE)
+        if scrambleFilter is None:
+            break
+        scrambleFilter.drawn += 1
+        if scrambleFilter.acceptLength(distance[idx]):
+            scrambleFilter.elapsed += watch.seconds()
+            break
+    return Scramble.undoing(solution(idx))
+
+def index(cube):
+    """Return the state index of a Cube of size 2. Its colors are read
+    relative to the piece in the DBL position, which is taken as solved.
+    """
+    facelets = ''
+    for f in 'URFDL':
+        face = cube.faces[f]
+        facelets += face[0][0] + f + face[0][1] + f + f + f + face[1][0] + f + face[1][1]
+    face = cube.rotate_2(cube.faces['B'])
+    facelets += face[0][0] + 'B' + face[0][1] + 'BBB' + face[1][0] + 'B' + face[1][1]
+
+    q = {'F':'F', 'R':'R', 'U':'U', 'D':'D', 'L':'L', 'B':'B'}
+    for pos, f in ((D7, 'D'), (B9, 'B'), (L7, 'L')):
+        q[facelets[pos]] = f
+        q[Turn.faces[-Turn.faces.index(facelets[pos]) - 1]] = Turn.faces[-Turn.faces.index(f) - 1]
+
+    corners = set(p for c in FaceCube.cornerFacelet for p in c)
+    facelets = ''.join(q[c] if i in corners else c for i, c in enumerate(facelets))
+
+    c = FaceCube(facelets).toCubieCube()
+    return getPerm(c.cp) * N_TWIST + getTwist(c.co)
+
+def solve(cube):
+    """Return an optimal solution of a Cube of size 2 and the time taken to find it."""
+    watch = Stopwatch()
+    return TurnSequence(toString(solution(index(cube))), Turn), watch.seconds()
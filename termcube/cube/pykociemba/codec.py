@@ -0,0 +1,146 @@
+from builtins import range
+
+
+# Ranking and unranking of the combinations and permutations which make up the coordinates of a
+# CubieCube.
+#
+# A combination of k places out of n is given by its places p[0] < p[1] < ... < p[k-1] and ranked
+# as the sum of Cnk(p[x], x + 1), so 0 <= rank < Cnk(n, k).
+#
+# A permutation of 0..k-1 is ranked in the factorial number system with the digits of the original
+# two-phase implementation: going down from j = k-1, the digit of j < j+1 is the number of left
+# rotations of perm[0..j] which bring j to place j. Those digits are found here by slicing instead of
+# rotating one element at a time, and the permutations of up to MAX_TABLE pieces are looked up.
+
+MAX_N = 12      # the most places of any combination
+MAX_TABLE = 6   # the most pieces of a permutation kept in the lookup tables
+
+
+def _binomial(n, k):
+    if n < k:
+        return 0
+    s = 1
+    for i in range(k):
+        s = s * (n - i) // (i + 1)
+    return s
+
+
+# binomial[n][k] is n choose k for 0 <= n, k <= MAX_N
+binomial = [[_binomial(n, k) for k in range(MAX_N + 1)] for n in range(MAX_N + 1)]
+
+# factorial[k] is k!
+factorial = [1]
+for _k in range(1, MAX_N + 1):
+    factorial.append(factorial[-1] * _k)
+
+
+def rankCombination(places):
+    """Return the rank of the combination of ascending places."""
+    ret = 0
+    for x, p in enumerate(places):
+        ret += binomial[p][x + 1]
+    return ret
+
+
+def unrankCombination(rank, k, n):
+    """Return the ascending places of the combination of k out of n places with the given rank."""
+    places = [0] * k
+    x = k - 1
+    for j in range(n - 1, -1, -1):
+        c = binomial[j][x + 1]
+        if rank >= c:
+            places[x] = j
+            rank -= c
+            x -= 1
+            if x < 0:
+                break
+    return places
+
+
+def _rankPermutation(perm):
+    perm = list(perm)
+    ret = 0
+    for j in range(len(perm) - 1, 0, -1):
+        p = perm.index(j)
+        ret = (j + 1) * ret + (p + 1) % (j + 1)
+        perm = perm[p + 1:j + 1] + perm[:p]
+    return ret
+
+
+def _unrankPermutation(rank, k):
+    perm = list(range(k))
+    for j in range(1, k):
+        rank, r = divmod(rank, j + 1)
+        if r:
+            perm[:j + 1] = perm[j + 1 - r:j + 1] + perm[:j + 1 - r]
+    return perm
+
+
+# permutations[k][b] is the permutation of k pieces with rank b, and permutationRank[k] maps it back
+permutations = [[tuple(_unrankPermutation(b, k)) for b in range(factorial[k])] for k in range(MAX_TABLE + 1)]
+permutationRank = [dict((perm, b) for b, perm in enumerate(table)) for table in permutations]
+
+
+def rankPermutation(perm):
+    """Return the rank of a permutation of 0..k-1."""
+    if len(perm) <= MAX_TABLE:
+        return permutationRank[len(perm)][tuple(perm)]
+    return _rankPermutation(perm)
+
+
+def unrankPermutation(rank, k):
+    """Return the permutation of 0..k-1 with the given rank as a list."""
+    if k <= MAX_TABLE:
+        return list(permutations[k][rank])
+    return _unrankPermutation(rank, k)
+
+
+def permutationParity(perm):
+    """Return the parity of a permutation of 0..n-1, 0 if even and 1 if odd, from its cycles."""
+    seen = [False] * len(perm)
+    parity = 0
+    for i in range(len(perm)):
+        if not seen[i]:
+            seen[i] = True
+            j = perm[i]
+            while j != i:   # a cycle of length k is k - 1 transpositions
+                seen[j] = True
+                j = perm[j]
+                parity ^= 1
+    return parity
+
+
+def rankPieces(arr, lo, hi, reverse=False):
+    """
+    Return the rank a of the combination of places of the pieces lo..hi in arr and the rank b of the
+    permutation of those pieces, taken in the order of their places. If reverse, the places are
+    counted from the end of arr.
+    """
+    if reverse:
+        arr = arr[::-1]
+    a = 0
+    x = 0
+    perm = []
+    for j, e in enumerate(arr):
+        if lo <= e <= hi:
+            x += 1
+            a += binomial[j][x]
+            perm.append(e - lo)
+    if reverse:
+        perm.reverse()
+    return a, rankPermutation(perm)
+
+
+def unrankPieces(a, b, k, lo, n, reverse=False):
+    """
+    Return a list of n places with the pieces lo..lo+k-1 placed by the ranks a and b of rankPieces
+    and None in the other places.
+    """
+    arr = [None] * n
+    perm = unrankPermutation(b, k)
+    places = unrankCombination(a, k, n)
+    if reverse:
+        places = [n - 1 - j for j in reversed(places)]
+    for x, j in enumerate(places):
+        arr[j] = perm[x] + lo
+    return arr
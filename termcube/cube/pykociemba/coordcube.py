@@ -7,33 +7,19 @@ try:
 except ImportError:
     import pickle as cPickle
 
-from .cubiecube import CubieCube, moveCube, getURtoDF
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .cubiecube import CubieCube, moveCube, allMoveCube, getURtoDF
+from ...stopwatch import Stopwatch
 
 log = logging.getLogger(__name__)
 
 cache_dir = os.path.join(os.path.dirname(__file__), 'prunetables')
 
 
-def setPruning(table, index, value):
-    """Set pruning value in table. Two values are stored in one byte."""
-    if ((index & 1) == 0):
-        table[index // 2] &= 0xf0 | value
-    else:
-        table[index // 2] &= 0x0f | (value << 4)
-    # table[index] = value & 0xf
-
-
-def getPruning(table, index):
-    """Extract pruning value"""
-
-    if ((index & 1) == 0):
-        res = table[index // 2] & 0x0f
-    else:
-        res = (table[index // 2] & 0xf0) >> 4
-    return res
-    # return table[index] & 0xf
-
-
 def load_cachetable(name):
     obj = None
     try:
@@ -49,6 +35,358 @@ def dump_cachetable(obj, name):
         cPickle.dump(obj, f)
 
 
+class NibbleTable(object):
+    """
+    A table of values 0 <= value < 16 with two entries in each byte of a bytearray, the even index in
+    the low nibble. Entries start at 0x0f, which the pruning tables use for unfilled.
+    """
+
+    __slots__ = ('size', 'data')
+
+    def __init__(self, size, data=None):
+        """
+        size - number of entries
+        data - bytes of the packed entries, or None for a table of 0x0f
+        """
+        self.size = size
+        self.data = bytearray(data) if data is not None else bytearray(b'\xff') * ((size + 1) // 2)
+
+    def __reduce__(self):
+        return NibbleTable, (self.size, bytes(self.data))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.data[index >> 1] >> ((index & 1) << 2) & 0x0f
+
+    def __setitem__(self, index, value):
+        shift = (index & 1) << 2
+        self.data[index >> 1] = self.data[index >> 1] & (0xf0 >> shift) | (value & 0x0f) << shift
+
+    def get_many(self, indices):
+        """Return the entries at indices, as an array if NumPy is installed."""
+        if numpy is not None:
+            indices = numpy.asarray(indices)
+            return self.view()[indices >> 1] >> ((indices & 1) << 2) & 0x0f
+        return [self[i] for i in indices]
+
+    def set_many(self, indices, value):
+        """Set the entries at indices, all different, to value."""
+        if numpy is not None:
+            indices = numpy.asarray(indices)
+            data = self.view()
+            for parity in (0, 1):
+                i = indices[(indices & 1) == parity] >> 1
+                data[i] = data[i] & (0xf0 >> 4 * parity) | (value & 0x0f) << 4 * parity
+        else:
+            for i in indices:
+                self[i] = value
+
+    def view(self):
+        """Return a NumPy array of the packed bytes which shares their memory."""
+        return numpy.frombuffer(self.data, numpy.uint8)
+
+    def unpack(self):
+        """
+        Return the entries as bytes, one in each byte. Indexing bytes costs about a quarter of a call of
+        __getitem__, so the search loops read their pruning tables unpacked.
+        """
+        ret = bytearray(2 * len(self.data))
+        ret[0::2] = self.data.translate(_lowNibble)
+        ret[1::2] = self.data.translate(_highNibble)
+        del ret[self.size:]
+        return bytes(ret)
+
+
+# Tables translating a byte of a NibbleTable to its even and its odd entry
+_lowNibble = bytes(i & 0x0f for i in range(256))
+_highNibble = bytes(i >> 4 for i in range(256))
+
+
+# Moves which keep a cube in the H-subgroup of phase2: U, D, R2, F2, L2 and B2
+phase2Moves = (0, 1, 2, 4, 7, 9, 10, 11, 13, 16)
+
+# Every table of CoordCube in order of construction, as (name, builder, args).
+builders = []
+
+
+def tableShape(builder, args):
+    """Return the type and length of the table which builder(*args) returns."""
+    if builder is pruningTable:
+        size = 1
+        for n, table in args[0]:
+            size *= n
+        return NibbleTable, size
+    return list, args[0]
+
+
+def cachedTable(name, builder, *args):
+    """
+    Return the named table from the cache. If it is missing, or is not of the type and length that
+    builder(*args) returns, as a cache written by an older version may be, build it and cache it.
+    """
+    builders.append((name, builder, args))
+    table = load_cachetable(name)
+    kind, size = tableShape(builder, args)
+    if table is not None and not (isinstance(table, kind) and len(table) == size):
+        log.warning('cache for %s is not a %s of %d entries. Recalculating it...', name, kind.__name__, size)
+        table = None
+    if table is None:
+        watch = Stopwatch()
+        table = builder(*args)
+        log.info('Built %s in %.1f seconds', name, watch.seconds())
+        dump_cachetable(table, name)
+    return table
+
+
+def moveTable(n, setter, getter, corners, pieces=None):
+    """
+    Return the move table of a coordinate with n values.
+
+    setter, getter - unbound CubieCube methods to set and get the coordinate
+    corners - whether the coordinate is of the corners or the edges
+    pieces - the pieces whose places the coordinate encodes, or None if it encodes their orientation
+    """
+    if numpy is not None:
+        return _numpyMoveTable(n, setter, getter, corners, pieces)
+
+    table = [[0] * 18 for i in range(n)]
+    a = CubieCube()
+    b = CubieCube()
+    multiply = a.cornerMultiply if corners else a.edgeMultiply
+    for i in range(n):
+        setter(a, i)
+        row = table[i]
+        for m in range(18):
+            multiply(allMoveCube[m], b)
+            row[m] = getter(b)
+    return table
+
+
+def _numpyDecode(n, setter, corners):
+    """Return arrays of the permutation and orientation of the CubieCube of every coordinate value."""
+    size = 8 if corners else 12
+    perm = numpy.empty((n, size), numpy.int64)
+    ori = numpy.empty((n, size), numpy.int64)
+    a = CubieCube()
+    for i in range(n):
+        setter(a, i)
+        perm[i] = a.cp if corners else a.ep
+        ori[i] = a.co if corners else a.eo
+    return perm, ori
+
+
+def _numpyEncoder(getter, corners, pieces):
+    """
+    Return a function encoding arrays of permutations and orientations like getter.
+
+    An orientation coordinate is a number in base 3 or 2 of all but the last orientation. A
+    coordinate of the places of k pieces is k! * a + b, where a depends only on the set of places
+    and b only on the order of the pieces in them, so both are looked up from getter.
+    """
+    size = 8 if corners else 12
+    if pieces is None:
+        weights = (3 if corners else 2) ** numpy.arange(size - 2, -1, -1)
+        return lambda perm, ori: ori[:, :-1] @ weights
+
+    k = len(pieces)
+    mult = 1
+    for i in range(2, k + 1):
+        mult *= i
+
+    def cube(places, order):
+        """Return a CubieCube with pieces[order[i]] in places[i] and the others after them."""
+        c = CubieCube()
+        arr = [None] * size
+        for place, i in zip(places, order):
+            arr[place] = pieces[i]
+        others = iter(i for i in range(size) if i not in pieces)
+        arr = [i if i is not None else next(others) for i in arr]
+        if corners:
+            c.cp = arr
+        else:
+            c.ep = arr
+        return c
+
+    # a for every set of places, indexed by a bitmask of the places
+    combination = numpy.zeros(1 << size, numpy.int64)
+    for m in range(1 << size):
+        places = [i for i in range(size) if m >> i & 1]
+        if len(places) == k:
+            combination[m] = getter(cube(places, range(k))) // mult
+
+    # b for every order, indexed by a number in base k of the order
+    permutation = numpy.zeros(k ** k, numpy.int64)
+    order = [0] * k
+    for code in range(k ** k):
+        for i in range(k):
+            order[i] = code // k ** i % k
+        if len(set(order)) == k:
+            permutation[code] = getter(cube(range(k), order)) % mult
+
+    index = numpy.full(size, k, numpy.int64)
+    index[list(pieces)] = numpy.arange(k)
+    placeWeights = 1 << numpy.arange(size)
+    orderWeights = k ** numpy.arange(k)
+
+    def encode(perm, ori):
+        i = index[perm]
+        mask = i < k
+        order = i[mask].reshape(len(perm), k)
+        return mult * combination[mask @ placeWeights] + permutation[order @ orderWeights]
+    return encode
+
+
+def _numpyMove(perm, ori, corners, j):
+    """Return the permutation and orientation arrays after the face turn j."""
+    if corners:
+        p, o, mod = moveCube[j].cp, moveCube[j].co, 3
+    else:
+        p, o, mod = moveCube[j].ep, moveCube[j].eo, 2
+    return perm[:, p], (ori[:, p] + o) % mod
+
+
+def _numpyMoveTable(n, setter, getter, corners, pieces):
+    """Build a move table with array operations, decoding each coordinate value once."""
+    perm, ori = _numpyDecode(n, setter, corners)
+    encode = _numpyEncoder(getter, corners, pieces)
+    table = numpy.empty((n, 18), numpy.int64)
+    for j in range(6):
+        p, o = perm, ori
+        for k in range(3):
+            p, o = _numpyMove(p, o, corners, j)
+            table[:, 3 * j + k] = encode(p, o)
+    return table.tolist()
+
+
+def mergeTable(n):
+    """
+    Return the table merging the coordinates URtoUL and UBtoDF, both less than n, into URtoDF. The
+    entry is -1 where both have an edge in the same place.
+    """
+    if numpy is None:
+        return [[getURtoDF(i, j) for j in range(n)] for i in range(n)]
+
+    # The setters put BR everywhere else.
+    BR = 11
+    a, _ = _numpyDecode(n, CubieCube.setURtoUL, False)
+    b, _ = _numpyDecode(n, CubieCube.setUBtoDF, False)
+    a = numpy.repeat(a, n, axis=0)
+    b = numpy.tile(b, (n, 1))
+    merged = numpy.where(a != BR, a, b)
+    collision = ((a != BR) & (b != BR)).any(axis=1)
+    merged[collision] = numpy.arange(12)   # any placement of all six edges, it is replaced by -1
+    table = _numpyEncoder(CubieCube.getURtoDF, False, range(6))(merged, None)
+    return numpy.where(collision, -1, table).reshape(n, n).tolist()
+
+
+def sliceTable(FRtoBR_Move):
+    """Return the move table of the position (not permutation) of the UD-slice edges, 0 <= slice < 495."""
+    return [[FRtoBR_Move[s * 24][j] // 24 for j in range(18)] for s in range(495)]
+
+
+def pruningTable(coords, moves=range(18)):
+    """
+    Return a NibbleTable of the distance to solved by breadth first search.
+
+    The search goes forward from the entries at the current depth until more than half the table is
+    filled. After that most entries of each depth are unfilled ones next to the previous depth, so
+    it goes backward, checking every unfilled entry for a neighbour at the current depth. This works
+    because the allowed moves are closed under inverses.
+
+    coords - list of (number of values, move table) of the coordinates combined in the index,
+             most significant first. For coordinates (a, b, c) the index is (a * n_b + b) * n_c + c.
+    moves - the moves allowed
+    """
+    size = 1
+    for n, table in coords:
+        size *= n
+
+    if numpy is not None:
+        return _numpyPruningTable(coords, moves, size)
+
+    def neighbours(i):
+        digits = []
+        for n, move in reversed(coords):
+            i, c = divmod(i, n)
+            digits.append(c)
+        digits.reverse()
+        for j in moves:
+            k = 0
+            for (n, move), c in zip(coords, digits):
+                k = k * n + move[c][j]
+            yield k
+
+    table = NibbleTable(size)
+    depth = 0
+    table[0] = 0
+    done = 1
+    while done != size:
+        backward = done > size // 2
+        for i in range(size):
+            if backward and table[i] == 0x0f:
+                for k in neighbours(i):
+                    if table[k] == depth:
+                        table[i] = depth + 1
+                        done += 1
+                        break
+            elif not backward and table[i] == depth:
+                for k in neighbours(i):
+                    if table[k] == 0x0f:
+                        table[k] = depth + 1
+                        done += 1
+        depth += 1
+        _logProgress(depth, backward, done, size)
+    return table
+
+
+def _logProgress(depth, backward, done, size):
+    log.info('depth %d searched %s: %d of %d entries (%.1f%%)',
+             depth, 'backward' if backward else 'forward', done, size, 100.0 * done / size)
+
+
+def _numpyPruningTable(coords, moves, size):
+    """Fill a pruning table by breadth first search over the whole frontier at once."""
+    table = NibbleTable(size)
+    table.set_many([0], 0)
+    tables = [(n, numpy.array(move, numpy.int64)) for n, move in coords]
+
+    def neighbours(i):
+        digits = []
+        for n, move in reversed(tables):
+            i, c = numpy.divmod(i, n)
+            digits.append(c)
+        digits.reverse()
+        for j in moves:
+            k = numpy.zeros(len(digits[0]), numpy.int64)
+            for (n, move), c in zip(tables, digits):
+                k = k * n + move[c, j]
+            yield k
+
+    frontier = numpy.zeros(1, numpy.int64)
+    depth = 0
+    done = 1
+    while done != size:
+        backward = done > size // 2
+        if backward:
+            unfilled = numpy.flatnonzero(table.get_many(numpy.arange(size)) == 0x0f)
+            found = numpy.zeros(len(unfilled), bool)
+            for k in neighbours(unfilled):
+                found |= table.get_many(k) == depth
+            frontier = unfilled[found]
+        else:
+            found = []
+            for k in neighbours(frontier):
+                found.append(k[table.get_many(k) == 0x0f])
+            frontier = numpy.unique(numpy.concatenate(found))
+        table.set_many(frontier, depth + 1)
+        done += len(frontier)
+        depth += 1
+        _logProgress(depth, backward, done, size)
+    return table
+
+
 class CoordCube(object):
     """Representation of the cube on the coordinate level"""
 
@@ -118,39 +456,14 @@ class CoordCube(object):
     # Move table for the twists of the corners
     # twist < 2187 in phase 2.
     # twist = 0 in phase 2.
-    twistMove = load_cachetable('twistMove')
-    if not twistMove:
-        twistMove = [[0] * N_MOVE for i in range(N_TWIST)]   # new short[N_TWIST][N_MOVE]
-        a = CubieCube()
-        for i in range(N_TWIST):
-            a.setTwist(i)
-            for j in range(6):
-                for k in range(3):
-                    a.cornerMultiply(moveCube[j])
-                    twistMove[i][3 * j + k] = a.getTwist()
-                a.cornerMultiply(moveCube[j])   # 4. faceturn restores
-                # a
-        dump_cachetable(twistMove, 'twistMove')
+    twistMove = cachedTable('twistMove', moveTable, N_TWIST, CubieCube.setTwist, CubieCube.getTwist, True)
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Move table for the flips of the edges
     # flip < 2048 in phase 1
     # flip = 0 in phase 2.
     log.info('Preparing move table for the flips of the edges')
-
-    flipMove = load_cachetable('flipMove')
-    if not flipMove:
-        flipMove = [[0] * N_MOVE for i in range(N_FLIP)]     # new short[N_FLIP][N_MOVE]
-        a = CubieCube()
-        for i in range(N_FLIP):
-            a.setFlip(i)
-            for j in range(6):
-                for k in range(3):
-                    a.edgeMultiply(moveCube[j])
-                    flipMove[i][3 * j + k] = a.getFlip()
-                a.edgeMultiply(moveCube[j])
-                # a
-        dump_cachetable(flipMove, 'flipMove')
+    flipMove = cachedTable('flipMove', moveTable, N_FLIP, CubieCube.setFlip, CubieCube.getFlip, False)
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Parity of the corner permutation. This is the same as the parity for the edge permutation of a valid cube.
@@ -167,19 +480,7 @@ class CoordCube(object):
     # FRtoBRMove < 11880 in phase 1
     # FRtoBRMove < 24 in phase 2
     # FRtoBRMove = 0 for solved cube
-
-    FRtoBR_Move = load_cachetable('FRtoBR_Move')
-    if not FRtoBR_Move:
-        FRtoBR_Move = [[0] * N_MOVE for i in range(N_FRtoBR)]    # new short[N_FRtoBR][N_MOVE]
-        a = CubieCube()
-        for i in range(N_FRtoBR):
-            a.setFRtoBR(i)
-            for j in range(6):
-                for k in range(3):
-                    a.edgeMultiply(moveCube[j])
-                    FRtoBR_Move[i][3 * j + k] = a.getFRtoBR()
-                a.edgeMultiply(moveCube[j])
-        dump_cachetable(FRtoBR_Move, 'FRtoBR_Move')
+    FRtoBR_Move = cachedTable('FRtoBR_Move', moveTable, N_FRtoBR, CubieCube.setFRtoBR, CubieCube.getFRtoBR, False, range(8, 12))
 
     # *******************************************Phase 1 and 2 movetable************************************************
 
@@ -189,18 +490,7 @@ class CoordCube(object):
     # URFtoDLF < 20160 in phase 2
     # URFtoDLF = 0 for solved cube.
     log.info('Preparing move table for permutation of six corners. The positions of the DBL and DRB corners are determined by the parity.')
-    URFtoDLF_Move = load_cachetable('URFtoDLF_Move')
-    if not URFtoDLF_Move:
-        URFtoDLF_Move = [[0] * N_MOVE for i in range(N_URFtoDLF)]    # new short[N_URFtoDLF][N_MOVE]
-        a = CubieCube()
-        for i in range(N_URFtoDLF):
-            a.setURFtoDLF(i)
-            for j in range(6):
-                for k in range(3):
-                    a.cornerMultiply(moveCube[j])
-                    URFtoDLF_Move[i][3 * j + k] = a.getURFtoDLF()
-                a.cornerMultiply(moveCube[j])
-        dump_cachetable(URFtoDLF_Move, 'URFtoDLF_Move')
+    URFtoDLF_Move = cachedTable('URFtoDLF_Move', moveTable, N_URFtoDLF, CubieCube.setURFtoDLF, CubieCube.getURFtoDLF, True, range(6))
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Move table for the permutation of six U-face and D-face edges in phase2. The positions of the DL and DB edges are
@@ -208,185 +498,74 @@ class CoordCube(object):
     # URtoDF < 665280 in phase 1
     # URtoDF < 20160 in phase 2
     # URtoDF = 0 for solved cube.
+    # Table values are only valid for phase 2 moves!
     log.info('Preparing move table for the permutation of six U-face and D-face edges in phase2. The positions of the DL and DB edges are')
-    URtoDF_Move = load_cachetable('URtoDF_Move')
-    if not URtoDF_Move:
-        URtoDF_Move = [[0] * N_MOVE for i in range(N_URtoDF)]    # new short[N_URtoDF][N_MOVE]
-        a = CubieCube()
-        for i in range(N_URtoDF):
-            a.setURtoDF(i)
-            for j in range(6):
-                for k in range(3):
-                    a.edgeMultiply(moveCube[j])
-                    URtoDF_Move[i][3 * j + k] = a.getURtoDF()
-                    # Table values are only valid for phase 2 moves!
-                    # For phase 1 moves, casting to short is not possible.
-                a.edgeMultiply(moveCube[j])
-        dump_cachetable(URtoDF_Move, 'URtoDF_Move')
+    URtoDF_Move = cachedTable('URtoDF_Move', moveTable, N_URtoDF, CubieCube.setURtoDF, CubieCube.getURtoDF, False, range(6))
 
     # **************************helper move tables to compute URtoDF for the beginning of phase2************************
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Move table for the three edges UR,UF and UL in phase1.
     log.info('Preparing move table for the three edges UR,UF and UL in phase1.')
-    URtoUL_Move = load_cachetable('URtoUL_Move')
-    if not URtoUL_Move:
-        URtoUL_Move = [[0] * N_MOVE for i in range(N_URtoUL)]    # new short[N_URtoUL][N_MOVE]
-        a = CubieCube()
-        for i in range(N_URtoUL):
-            a.setURtoUL(i)
-            for j in range(6):
-                for k in range(3):
-                    a.edgeMultiply(moveCube[j])
-                    URtoUL_Move[i][3 * j + k] = a.getURtoUL()
-                a.edgeMultiply(moveCube[j])
-        dump_cachetable(URtoUL_Move, 'URtoUL_Move')
+    URtoUL_Move = cachedTable('URtoUL_Move', moveTable, N_URtoUL, CubieCube.setURtoUL, CubieCube.getURtoUL, False, range(3))
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Move table for the three edges UB,DR and DF in phase1.
     log.info('Preparing move table for the three edges UB,DR and DF in phase1.')
-    UBtoDF_Move = load_cachetable('UBtoDF_Move')
-    if not UBtoDF_Move:
-        UBtoDF_Move = [[0] * N_MOVE for i in range(N_UBtoDF)]    # new short[N_UBtoDF][N_MOVE]
-        a = CubieCube()
-        for i in range(N_UBtoDF):
-            a.setUBtoDF(i)
-            for j in range(6):
-                for k in range(3):
-                    a.edgeMultiply(moveCube[j])
-                    UBtoDF_Move[i][3 * j + k] = a.getUBtoDF()
-                a.edgeMultiply(moveCube[j])
-        dump_cachetable(UBtoDF_Move, 'UBtoDF_Move')
+    UBtoDF_Move = cachedTable('UBtoDF_Move', moveTable, N_UBtoDF, CubieCube.setUBtoDF, CubieCube.getUBtoDF, False, range(3, 6))
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Table to merge the coordinates of the UR,UF,UL and UB,DR,DF edges at the beginning of phase2
+    # for i, j <336 the six edges UR,UF,UL,UB,DR,DF are not in the UD-slice and the index is <20160
     log.info('Preparing table to merge the coordinates of the UR,UF,UL and UB,DR,DF edges at the beginning of phase2')
-    MergeURtoULandUBtoDF = load_cachetable('MergeURtoULandUBtoDF')
-    if not MergeURtoULandUBtoDF:
-        MergeURtoULandUBtoDF = [[0] * 336 for i in range(336)]   # new short[336][336]
-        # for i, j <336 the six edges UR,UF,UL,UB,DR,DF are not in the
-        # UD-slice and the index is <20160
-        for uRtoUL in range(336):
-            for uBtoDF in range(336):
-                MergeURtoULandUBtoDF[uRtoUL][uBtoDF] = getURtoDF(uRtoUL, uBtoDF)
-        dump_cachetable(MergeURtoULandUBtoDF, 'MergeURtoULandUBtoDF')
+    MergeURtoULandUBtoDF = cachedTable('MergeURtoULandUBtoDF', mergeTable, 336)
 
     # ****************************************Pruning tables for the search*********************************************
+    # The pruning tables are NibbleTables in the cache and unpacked to one entry per byte here, which the search
+    # loops index faster.
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Pruning table for the permutation of the corners and the UD-slice edges in phase2.
     # The pruning table entries give a lower estimation for the number of moves to reach the solved cube.
     log.info('Preparing pruning table for the permutation of the corners and the UD-slice edges in phase2.')
-    Slice_URFtoDLF_Parity_Prun = load_cachetable('Slice_URFtoDLF_Parity_Prun')
-    if not Slice_URFtoDLF_Parity_Prun:
-        Slice_URFtoDLF_Parity_Prun = [-1] * (N_SLICE2 * N_URFtoDLF * N_PARITY // 2)     # new byte[N_SLICE2 * N_URFtoDLF * N_PARITY / 2]
-        # Slice_URFtoDLF_Parity_Prun = [-1] * (N_SLICE2 * N_URFtoDLF * N_PARITY)
-        depth = 0
-        setPruning(Slice_URFtoDLF_Parity_Prun, 0, 0)
-        done = 1
-        while (done != N_SLICE2 * N_URFtoDLF * N_PARITY):
-            for i in range(N_SLICE2 * N_URFtoDLF * N_PARITY):
-                parity = i % 2
-                URFtoDLF = (i // 2) // N_SLICE2
-                _slice = (i // 2) % N_SLICE2
-                if getPruning(Slice_URFtoDLF_Parity_Prun, i) == depth:
-                    for j in range(18):
-                        if j in (3, 5, 6, 8, 12, 14, 15, 17):
-                            continue
-                        else:
-                            newSlice = FRtoBR_Move[_slice][j]
-                            newURFtoDLF = URFtoDLF_Move[URFtoDLF][j]
-                            newParity = parityMove[parity][j]
-                            if (getPruning(Slice_URFtoDLF_Parity_Prun, (N_SLICE2 * newURFtoDLF + newSlice) * 2 + newParity) == 0x0f):
-                                setPruning(
-                                    Slice_URFtoDLF_Parity_Prun,
-                                    (N_SLICE2 * newURFtoDLF + newSlice) * 2 + newParity,
-                                    (depth + 1) & 0xff
-                                )
-                                done += 1
-
-            depth += 1
-        dump_cachetable(Slice_URFtoDLF_Parity_Prun, 'Slice_URFtoDLF_Parity_Prun')
+    Slice_URFtoDLF_Parity_Prun = cachedTable(
+        'Slice_URFtoDLF_Parity_Prun', pruningTable,
+        [(N_URFtoDLF, URFtoDLF_Move), (N_SLICE2, FRtoBR_Move), (N_PARITY, parityMove)], phase2Moves
+    ).unpack()
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Pruning table for the permutation of the edges in phase2.
     # The pruning table entries give a lower estimation for the number of moves to reach the solved cube.
     log.info('Preparing pruning table for the permutation of the edges in phase2.')
-    Slice_URtoDF_Parity_Prun = load_cachetable('Slice_URtoDF_Parity_Prun')
-    if not Slice_URtoDF_Parity_Prun:
-        Slice_URtoDF_Parity_Prun = [-1] * (N_SLICE2 * N_URtoDF * N_PARITY // 2)  # new byte[N_SLICE2 * N_URtoDF * N_PARITY / 2]
-        # Slice_URtoDF_Parity_Prun = [-1] * (N_SLICE2 * N_URtoDF * N_PARITY)  # new byte[N_SLICE2 * N_URtoDF * N_PARITY / 2]
-        depth = 0
-        setPruning(Slice_URtoDF_Parity_Prun, 0, 0)
-        done = 1
-        while (done != N_SLICE2 * N_URtoDF * N_PARITY):
-            for i in range(N_SLICE2 * N_URtoDF * N_PARITY):
-                parity = i % 2
-                URtoDF = (i // 2) // N_SLICE2
-                _slice = (i // 2) % N_SLICE2
-                if (getPruning(Slice_URtoDF_Parity_Prun, i) == depth):
-                    for j in range(18):
-                        if j in (3, 5, 6, 8, 12, 14, 15, 17):
-                            continue
-                        else:
-                            newSlice = FRtoBR_Move[_slice][j]
-                            newURtoDF = URtoDF_Move[URtoDF][j]
-                            newParity = parityMove[parity][j]
-                            if (getPruning(Slice_URtoDF_Parity_Prun, (N_SLICE2 * newURtoDF + newSlice) * 2 + newParity) == 0x0f):
-                                setPruning(
-                                    Slice_URtoDF_Parity_Prun,
-                                    (N_SLICE2 * newURtoDF + newSlice) * 2 + newParity,
-                                    (depth + 1) & 0xff
-                                )
-                                done += 1
-            depth += 1
-        dump_cachetable(Slice_URtoDF_Parity_Prun, 'Slice_URtoDF_Parity_Prun')
+    Slice_URtoDF_Parity_Prun = cachedTable(
+        'Slice_URtoDF_Parity_Prun', pruningTable,
+        [(N_URtoDF, URtoDF_Move), (N_SLICE2, FRtoBR_Move), (N_PARITY, parityMove)], phase2Moves
+    ).unpack()
+
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # Move table for the position (not permutation) of the UD-slice edges in phase1, read from FRtoBR_Move.
+    sliceMove = sliceTable(FRtoBR_Move)
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Pruning table for the twist of the corners and the position (not permutation) of the UD-slice edges in phase1
     # The pruning table entries give a lower estimation for the number of moves to reach the H-subgroup.
     log.info('Pruning table for the twist of the corners and the position (not permutation) of the UD-slice edges in phase1')
-    Slice_Twist_Prun = load_cachetable('Slice_Twist_Prun')
-    if not Slice_Twist_Prun:
-        Slice_Twist_Prun = [-1] * (N_SLICE1 * N_TWIST // 2 + 1)  # new byte[N_SLICE1 * N_TWIST / 2 + 1]
-        # Slice_Twist_Prun = [-1] * (N_SLICE1 * N_TWIST + 1)  # new byte[N_SLICE1 * N_TWIST / 2 + 1]
-        depth = 0
-        setPruning(Slice_Twist_Prun, 0, 0)
-        done = 1
-        while (done != N_SLICE1 * N_TWIST):
-            for i in range(N_SLICE1 * N_TWIST):
-                twist = i // N_SLICE1
-                _slice = i % N_SLICE1
-                if (getPruning(Slice_Twist_Prun, i) == depth):
-                    for j in range(18):
-                        newSlice = FRtoBR_Move[_slice * 24][j] // 24
-                        newTwist = twistMove[twist][j]
-                        if (getPruning(Slice_Twist_Prun, N_SLICE1 * newTwist + newSlice) == 0x0f):
-                            setPruning(Slice_Twist_Prun, N_SLICE1 * newTwist + newSlice, (depth + 1) & 0xff)
-                            done += 1
-
-            depth += 1
-        dump_cachetable(Slice_Twist_Prun, 'Slice_Twist_Prun')
+    Slice_Twist_Prun = cachedTable('Slice_Twist_Prun', pruningTable, [(N_TWIST, twistMove), (N_SLICE1, sliceMove)]).unpack()
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Pruning table for the flip of the edges and the position (not permutation) of the UD-slice edges in phase1
     # The pruning table entries give a lower estimation for the number of moves to reach the H-subgroup.
     log.info('Pruning table for the flip of the edges and the position (not permutation) of the UD-slice edges in phase1')
-    Slice_Flip_Prun = load_cachetable('Slice_Flip_Prun')
-    if not Slice_Flip_Prun:
-        Slice_Flip_Prun = [-1] * (N_SLICE1 * N_FLIP // 2)    # new byte[N_SLICE1 * N_FLIP / 2]
-        # Slice_Flip_Prun = [-1] * (N_SLICE1 * N_FLIP)    # new byte[N_SLICE1 * N_FLIP / 2]
-        depth = 0
-        setPruning(Slice_Flip_Prun, 0, 0)
-        done = 1
-        while (done != N_SLICE1 * N_FLIP):
-            for i in range(N_SLICE1 * N_FLIP):
-                flip = i // N_SLICE1
-                _slice = i % N_SLICE1
-                if (getPruning(Slice_Flip_Prun, i) == depth):
-                    for j in range(18):
-                        newSlice = FRtoBR_Move[_slice * 24][j] // 24
-                        newFlip = flipMove[flip][j]
-                        if (getPruning(Slice_Flip_Prun, N_SLICE1 * newFlip + newSlice) == 0x0f):
-                            setPruning(Slice_Flip_Prun, N_SLICE1 * newFlip + newSlice, (depth + 1) & 0xff)
-                            done += 1
-            depth += 1
-        dump_cachetable(Slice_Flip_Prun, 'Slice_Flip_Prun')
+    Slice_Flip_Prun = cachedTable('Slice_Flip_Prun', pruningTable, [(N_FLIP, flipMove), (N_SLICE1, sliceMove)]).unpack()
+
+
+def buildTables():
+    """
+    Build every table of CoordCube again in order of construction, replacing the cached files. Yield
+    the name of each table and the seconds taken to build it.
+    """
+    for name, builder, args in builders:
+        watch = Stopwatch()
+        table = builder(*args)
+        t = watch.seconds()
+        dump_cachetable(table, name)
+        setattr(CoordCube, name, table.unpack() if isinstance(table, NibbleTable) else table)
+        yield name, t
@@ -1,42 +1,18 @@
-import copy
 from builtins import range
 
 from .corner import URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB, corner_values
 from .edge import UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR, edge_values
 from .facecube import FaceCube
+from .codec import (
+    binomial, rankPermutation, unrankPermutation, rankPieces, unrankPieces, permutationParity,
+)
 
 
 # n choose k
 def Cnk(n, k):
     if n < k:
         return 0
-    if k > n // 2:
-        k = n - k
-    s = 1
-    i = n
-    j = 1
-    while i != n - k:
-        s *= i
-        s //= j
-        i -= 1
-        j += 1
-    return s
-
-
-def rotateLeft(arr, l, r):
-    """Left rotation of all array elements between l and r"""
-    temp = arr[l]
-    for i in range(l, r):
-        arr[i] = arr[i + 1]
-    arr[r] = temp
-
-
-def rotateRight(arr, l, r):
-    """Right rotation of all array elements between l and r"""
-    temp = arr[r]
-    for i in range(r, l, -1):
-        arr[i] = arr[i - 1]
-    arr[l] = temp
+    return binomial[n][k]
 
 
 def getURtoDF(idx1, idx2):
@@ -55,22 +31,27 @@ def getURtoDF(idx1, idx2):
 
 
 class CubieCube(object):
-    """Cube on the cubie level"""
+    """
+    Cube on the cubie level. The permutations and orientations are four lists rather than one flat
+    bytearray, since a multiplication reads and writes lists about twice as fast.
+    """
+
+    __slots__ = ('cp', 'co', 'ep', 'eo')
 
     # initialize to Id-Cube
 
     def __init__(self, cp=None, co=None, ep=None, eo=None):
         # corner permutation
-        self.cp = copy.copy(cp) if cp else [URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB]
+        self.cp = list(cp) if cp else [URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB]
 
         # corner orientation
-        self.co = copy.copy(co) if co else [0, 0, 0, 0, 0, 0, 0, 0]
+        self.co = list(co) if co else [0, 0, 0, 0, 0, 0, 0, 0]
 
         # edge permutation
-        self.ep = copy.copy(ep) if ep else [UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR]
+        self.ep = list(ep) if ep else [UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR]
 
         # edge orientation
-        self.eo = copy.copy(eo) if eo else [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        self.eo = list(eo) if eo else [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
 
     def toFaceCube(self):
         """return cube in facelet representation"""
@@ -89,86 +70,61 @@ class CubieCube(object):
                 fcRet.f[_butya] = FaceCube.edgeColor[self.ep[i]][n]
         return fcRet
 
-    def cornerMultiply(self, b):
+    def cornerMultiply(self, b, out=None):
         """
-        Multiply this CubieCube with another cubiecube b, restricted to the corners.<br>
-        Because we also describe reflections of the whole cube by permutations, we get a complication with the corners. The
-        orientations of mirrored corners are described by the numbers 3, 4 and 5. The composition of the orientations
-        cannot
-        be computed by addition modulo three in the cyclic group C3 any more. Instead the rules below give an addition in
-        the dihedral group D3 with 6 elements.<br>
-
-        NOTE: Because we do not use symmetry reductions and hence no mirrored cubes in this simple implementation of the
-        Two-Phase-Algorithm, some code is not necessary here.
+        Multiply this CubieCube with another cubiecube b, restricted to the corners, and put the product
+        in out, which is this cube by default.<br>
+        The full two-phase algorithm also describes reflections of the whole cube, with orientations
+        3, 4 and 5 for mirrored corners. We use no symmetry reductions and hence no mirrored cubes in
+        this simple implementation, so orientations are just added modulo three.
 
         b - CubieCube instance
         """
 
-        cPerm = []  # new Corner[8]
-        cOri = []   # new byte[8]
-        for i in corner_values:
-            cPerm.append(self.cp[b.cp[i]])
-
-            oriA = self.co[b.cp[i]]
-            oriB = b.co[i]
-            ori = 0
-
-            if oriA < 3 and oriB < 3:  # if both cubes are regular cubes...
-                ori = (oriA + oriB) & 0xff   # just do an addition modulo 3 here
-                if ori >= 3:
-                    ori -= 3    # the composition is a regular cube
-
-            # +++++++++++++++++++++not used in this implementation +++++++++++++
-            elif oriA < 3 and oriB >= 3:    # if cube b is in a mirrored
-                # state...
-                ori = (oriA + oriB) & 0xff
-                if ori >= 6:
-                    ori -= 3    # the composition is a mirrored cube
-            elif oriA >= 3 and oriB < 3:    # if cube a is an a mirrored
-                # state...
-                ori = (oriA - oriB) & 0xff
-                if ori < 3:
-                    ori += 3    # the composition is a mirrored cube
-            elif oriA >= 3 and oriB >= 3:   # if both cubes are in mirrored
-                # states...
-                ori = (oriA - oriB) & 0xff
-                if ori < 0:
-                    ori += 3    # the composition is a regular cube
-            # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-            cOri.append(ori)
-
+        if out is None:
+            out = self
+        cp, co, bcp, bco = self.cp, self.co, b.cp, b.co
+        if out is self:     # read copies of a factor which is overwritten
+            cp, co = cp[:], co[:]
+        if out is b:
+            bcp, bco = bcp[:], bco[:]
+        ocp, oco = out.cp, out.co
         for i in corner_values:
-            self.cp[i] = cPerm[i]
-            self.co[i] = cOri[i]
+            j = bcp[i]
+            ocp[i] = cp[j]
+            oco[i] = (co[j] + bco[i]) % 3
 
-    def edgeMultiply(self, b):
+    def edgeMultiply(self, b, out=None):
         """
-        Multiply this CubieCube with another cubiecube b, restricted to the edges.
+        Multiply this CubieCube with another cubiecube b, restricted to the edges, and put the product
+        in out, which is this cube by default.
 
         b - CubieCube instance
         """
 
-        ePerm = []  # new Edge[12]
-        eOri = []   # new byte[12]
+        if out is None:
+            out = self
+        ep, eo, bep, beo = self.ep, self.eo, b.ep, b.eo
+        if out is self:     # read copies of a factor which is overwritten
+            ep, eo = ep[:], eo[:]
+        if out is b:
+            bep, beo = bep[:], beo[:]
+        oep, oeo = out.ep, out.eo
         for i in edge_values:
-            _ = b.ep[i]
-            ePerm.append(self.ep[_])
-            eOri.append(((b.eo[i] + self.eo[_]) % 2) & 0xff)
+            j = bep[i]
+            oep[i] = ep[j]
+            oeo[i] = eo[j] ^ beo[i]
 
-        for i in edge_values:
-            self.ep[i] = ePerm[i]
-            self.eo[i] = eOri[i]
-
-    def multiply(self, b):
+    def multiply(self, b, out=None):
         """
-        Multiply this CubieCube with another CubieCube b.
+        Multiply this CubieCube with another CubieCube b and put the product in out, which is this
+        cube by default.
 
         b - CubieCube instance
         """
 
-        self.cornerMultiply(b)
-        self.edgeMultiply(b)
+        self.cornerMultiply(b, out)
+        self.edgeMultiply(b, out)
 
     def invCubieCube(self, c):
         """
@@ -230,301 +186,77 @@ class CubieCube(object):
 
     def cornerParity(self):
         """Parity of the corner permutation"""
-        s = 0
-        for i in range(DRB, URF, -1):
-            for j in range(i - 1, URF - 1, -1):
-                if self.cp[j] > self.cp[i]:
-                    s += 1
-        return (s % 2) & 0xffff
+        return permutationParity(self.cp)
 
     def edgeParity(self):
         """Parity of the edges permutation. Parity of corners and edges are the same if the cube is solvable."""
-        s = 0
-        for i in range(BR, UR, -1):
-            for j in range(i - 1, UR - 1, -1):
-                if self.ep[j] > self.ep[i]:
-                    s += 1
-        return (s % 2) & 0xffff
+        return permutationParity(self.ep)
 
     def getFRtoBR(self):
         """permutation of the UD-slice edges FR,FL,BL and BR"""
-        a = 0
-        x = 0
-        edge4 = [None] * 4  # new Edge[4]
-        # compute the index a < (12 choose 4) and the permutation array perm.
-        for j in range(BR, UR - 1, -1):
-            if (FR <= self.ep[j] and self.ep[j] <= BR):
-                a += Cnk(11 - j, x + 1)
-                edge4[3 - x] = self.ep[j]
-                x += 1
-
-        b = 0
-        for j in range(3, 0, -1):  # compute the index b < 4! for the permutation in perm
-            k = 0
-            while (edge4[j] != j + 8):
-                rotateLeft(edge4, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return (24 * a + b) & 0xffff
+        # the index a < (12 choose 4) of the places counted from BR and the index b < 4! for the
+        # permutation of the slice edges
+        a, b = rankPieces(self.ep, FR, BR, True)
+        return 24 * a + b
 
     def setFRtoBR(self, idx):
-        sliceEdge = [FR, FL, BL, BR]
-        otherEdge = [UR, UF, UL, UB, DR, DF, DL, DB]
-        b = idx % 24   # Permutation
-        a = idx // 24   # Combination
-        for i in edge_values:
-            self.ep[i] = DB     # Use UR to invalidate all edges
-
-        for j in range(1, 4):  # generate permutation from index b
-            k = b % (j + 1)
-            b //= j + 1
-
-            while k > 0:    # while (k-- > 0) #????????????????
-                k -= 1
-                rotateRight(sliceEdge, 0, j)
-
-        x = 3   # generate combination and set slice edges
-        for j in range(UR, BR + 1):
-            if a - Cnk(11 - j, x + 1) >= 0:
-                self.ep[j] = sliceEdge[3 - x]
-                a -= Cnk(11 - j, x + 1)
-                x -= 1
-        x = 0   # set the remaining edges UR..DB
-        for j in range(UR, BR + 1):
-            if self.ep[j] == DB:
-                self.ep[j] = otherEdge[x]
-                x += 1
+        otherEdge = iter((UR, UF, UL, UB, DR, DF, DL, DB))
+        ep = unrankPieces(idx // 24, idx % 24, 4, FR, 12, True)
+        self.ep[:] = [next(otherEdge) if e is None else e for e in ep]
 
     def getURFtoDLF(self):
         """Permutation of all corners except DBL and DRB"""
-        a = 0
-        x = 0
-        corner6 = []    # new Corner[6]
-        # compute the index a < (8 choose 6) and the corner permutation.
-        for j in range(URF, DRB + 1):
-            if self.cp[j] <= DLF:
-                a += Cnk(j, x + 1)
-                corner6.append(self.cp[j])
-                x += 1
-
-        b = 0
-        for j in range(5, 0, -1):   # compute the index b < 6! for the
-            # permutation in corner6
-            k = 0
-            while corner6[j] != j:
-                rotateLeft(corner6, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return (720 * a + b) & 0xffff
+        # the index a < (8 choose 6) of the places and the index b < 6! for the corner permutation
+        a, b = rankPieces(self.cp, URF, DLF)
+        return 720 * a + b
 
     def setURFtoDLF(self, idx):
-        corner6 = [URF, UFL, ULB, UBR, DFR, DLF]
-        otherCorner = [DBL, DRB]
-        b = idx % 720  # Permutation
-        a = idx // 720  # Combination
-        for i in corner_values:
-            self.cp[i] = DRB    # Use DRB to invalidate all corners
-
-        for j in range(1, 6):   # generate permutation from index b
-            k = b % (j + 1)
-            b //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(corner6, 0, j)
-        x = 5
-        # generate combination and set corners
-        for j in range(DRB, -1, -1):
-            if a - Cnk(j, x + 1) >= 0:
-                self.cp[j] = corner6[x]
-                a -= Cnk(j, x + 1)
-                x -= 1
-        x = 0
-        for j in range(URF, DRB + 1):
-            if self.cp[j] == DRB:
-                self.cp[j] = otherCorner[x]
-                x += 1
+        otherCorner = iter((DBL, DRB))
+        cp = unrankPieces(idx // 720, idx % 720, 6, URF, 8)
+        self.cp[:] = [next(otherCorner) if c is None else c for c in cp]
 
     def getURtoDF(self):
         """Permutation of the six edges UR,UF,UL,UB,DR,DF."""
-        a = 0
-        x = 0
-        edge6 = []  # new Edge[6]
-        # compute the index a < (12 choose 6) and the edge permutation.
-        for j in range(UR, BR + 1):
-            if self.ep[j] <= DF:
-                a += Cnk(j, x + 1)
-                edge6.append(self.ep[j])
-                x += 1
-
-        b = 0
-        for j in range(5, 0, -1):  # compute the index b < 6! for the permutation in edge6
-            k = 0
-            while edge6[j] != j:
-                rotateLeft(edge6, 0, j)
-                k += 1
-            b = (j + 1) * b + k
+        # the index a < (12 choose 6) of the places and the index b < 6! for the edge permutation
+        a, b = rankPieces(self.ep, UR, DF)
         return 720 * a + b
 
     def setURtoDF(self, idx):
-        edge6 = [UR, UF, UL, UB, DR, DF]
-        otherEdge = [DL, DB, FR, FL, BL, BR]
-        b = idx % 720  # Permutation
-        a = idx // 720  # Combination
-        for i in edge_values:
-            self.ep[i] = BR     # Use BR to invalidate all edges
-
-        for j in range(1, 6):   # generate permutation from index b
-            k = b % (j + 1)
-            b //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(edge6, 0, j)
-        x = 5
-        # generate combination and set edges
-        for j in range(BR, -1, -1):
-            if a - Cnk(j, x + 1) >= 0:
-                self.ep[j] = edge6[x]
-                a -= Cnk(j, x + 1)
-                x -= 1
-        x = 0
-        # set the remaining edges DL..BR
-        for j in range(UR, BR + 1):
-            if self.ep[j] == BR:
-                self.ep[j] = otherEdge[x]
-                x += 1
+        otherEdge = iter((DL, DB, FR, FL, BL, BR))
+        ep = unrankPieces(idx // 720, idx % 720, 6, UR, 12)
+        self.ep[:] = [next(otherEdge) if e is None else e for e in ep]
 
     def getURtoUL(self):
         """Permutation of the three edges UR,UF,UL"""
-        a = 0
-        x = 0
-        edge3 = []  # new Edge[3]
-        # compute the index a < (12 choose 3) and the edge permutation.
-        for j in range(UR, BR + 1):
-            if self.ep[j] <= UL:
-                a += Cnk(j, x + 1)
-                edge3.append(self.ep[j])
-                x += 1
-
-        b = 0
-        for j in range(2, 0, -1):  # compute the index b < 3! for the permutation in edge3
-            k = 0
-            while edge3[j] != j:
-                rotateLeft(edge3, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return (6 * a + b) & 0xffff
+        # the index a < (12 choose 3) of the places and the index b < 3! for the edge permutation
+        a, b = rankPieces(self.ep, UR, UL)
+        return 6 * a + b
 
     def setURtoUL(self, idx):
-        edge3 = [UR, UF, UL]
-        b = idx % 6    # Permutation
-        a = idx // 6    # Combination
-        for i in edge_values:
-            self.ep[i] = BR    # Use BR to invalidate all edges
-
-        for j in range(1, 3):   # generate permutation from index b
-            k = b % (j + 1)
-            b //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(edge3, 0, j)
-        x = 2  # generate combination and set edges
-        for j in range(BR, -1, -1):
-            if a - Cnk(j, x + 1) >= 0:
-                self.ep[j] = edge3[x]
-                a -= Cnk(j, x + 1)
-                x -= 1
+        ep = unrankPieces(idx // 6, idx % 6, 3, UR, 12)
+        self.ep[:] = [BR if e is None else e for e in ep]  # Use BR to invalidate all other edges
 
     def getUBtoDF(self):
         """Permutation of the three edges UB,DR,DF"""
-        a = 0
-        x = 0
-        edge3 = []  # new Edge[3]
-        # compute the index a < (12 choose 3) and the edge permutation.
-        for j in range(UR, BR + 1):
-            if UB <= self.ep[j] and self.ep[j] <= DF:
-                a += Cnk(j, x + 1)
-                edge3.append(self.ep[j])
-                x += 1
-
-        b = 0
-        for j in range(2, 0, -1):  # compute the index b < 3! for the permutation in edge3
-            k = 0
-            while edge3[j] != UB + j:
-                rotateLeft(edge3, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return (6 * a + b) & 0xffff
+        # the index a < (12 choose 3) of the places and the index b < 3! for the edge permutation
+        a, b = rankPieces(self.ep, UB, DF)
+        return 6 * a + b
 
     def setUBtoDF(self, idx):
-        edge3 = [UB, DR, DF]
-        b = idx % 6    # Permutation
-        a = idx // 6    # Combination
-        for i in edge_values:
-            self.ep[i] = BR     # Use BR to invalidate all edges
-
-        for j in range(1, 3):
-            # generate permutation from index b
-            k = b % (j + 1)
-            b //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(edge3, 0, j)
-        x = 2
-        # generate combination and set edges
-        for j in range(BR, -1, -1):
-            if a - Cnk(j, x + 1) >= 0:
-                self.ep[j] = edge3[x]
-                a -= Cnk(j, x + 1)
-                x -= 1
+        ep = unrankPieces(idx // 6, idx % 6, 3, UB, 12)
+        self.ep[:] = [BR if e is None else e for e in ep]  # Use BR to invalidate all other edges
 
     def getURFtoDLB(self):
-        perm = copy.copy(self.cp)
-        b = 0
-        for j in range(7, 0, -1):  # compute the index b < 8! for the permutation in perm
-            k = 0
-            while perm[j] != j:
-                rotateLeft(perm, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return b
+        return rankPermutation(self.cp)
 
     def setURFtoDLB(self, idx):
-        perm = [URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB]
-        for j in range(1, 8):
-            k = idx % (j + 1)
-            idx //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(perm, 0, j)
-        x = 7
-        # set corners
-        for j in range(7, -1, -1):
-            self.cp[j] = perm[x]
-            x -= 1
+        self.cp[:] = unrankPermutation(idx, 8)
 
     def getURtoBR(self):
-        perm = copy.copy(self.ep)
-        b = 0
-        for j in range(11, 0, -1):     # compute the index b < 12! for the permutation in perm
-            k = 0
-            while perm[j] != j:
-                rotateLeft(perm, 0, j)
-                k += 1
-            b = (j + 1) * b + k
-        return b
+        return rankPermutation(self.ep)
 
     def setURtoBR(self, idx):
-        perm = [UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR]
-        for j in range(1, 12):
-            k = idx % (j + 1)
-            idx //= j + 1
-            while k > 0:
-                k -= 1
-                rotateRight(perm, 0, j)
-        x = 11  # set edges
-        for j in range(11, -1, -1):
-            self.ep[j] = perm[x]
-            x -= 1
+        self.ep[:] = unrankPermutation(idx, 12)
 
     def verify(self):
         """
@@ -606,3 +338,15 @@ moveCube = [
     CubieCube(cp=cpL, co=coL, ep=epL, eo=eoL),
     CubieCube(cp=cpB, co=coB, ep=epB, eo=eoB),
 ]
+
+
+def _power(c, n):
+    """Return the CubieCube c multiplied with itself n times."""
+    ret = CubieCube()
+    for i in range(n):
+        ret.multiply(c)
+    return ret
+
+
+# the 18 moves U, U2, U', R, R2, R', ... in the order of the move tables
+allMoveCube = [_power(c, k) for c in moveCube for k in range(1, 4)]
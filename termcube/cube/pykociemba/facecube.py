@@ -1,4 +1,5 @@
 from builtins import range
+from itertools import product
 
 from .facelet import (
     U1, U2, U3, U4, U5, U6, U7, U8, U9, R1, R2, R3, R4, R5, R6, R7, R8, R9,
@@ -57,43 +58,59 @@ class FaceCube(object):
 
     # Gives CubieCube representation of a faceletcube
     def toCubieCube(self):
-        from .cubiecube import CubieCube
-        
-        ccRet = CubieCube()
-        for i in range(8):
-            ccRet.cp[i] = URF   # invalidate corners
-        for i in range(12):
-            ccRet.ep[i] = UR    # and edges
-
-        for i in corner_values:
-            # get the colors of the cubie at corner i, starting with U/D
-            for ori in range(3):
-                if (self.f[self.cornerFacelet[i][ori]] == U
-                        or self.f[self.cornerFacelet[i][ori]] == D):
-                    break
-            col1 = self.f[self.cornerFacelet[i][(ori + 1) % 3]]
-            col2 = self.f[self.cornerFacelet[i][(ori + 2) % 3]]
-
-            for j in corner_values:
-                if (col1 == self.cornerColor[j][1]
-                        and col2 == self.cornerColor[j][2]):
-                    # in cornerposition i we have cornercubie j
-                    ccRet.cp[i] = j
-                    ccRet.co[i] = ori % 3
-                    break
-
-        for i in edge_values:
-            for j in edge_values:
-                if (self.f[self.edgeFacelet[i][0]] == self.edgeColor[j][0]
-                        and self.f[self.edgeFacelet[i][1]] == self.edgeColor[j][1]):
-                    ccRet.ep[i] = j
-                    ccRet.eo[i] = 0
-                    break
-
-                if (self.f[self.edgeFacelet[i][0]] == self.edgeColor[j][1]
-                        and self.f[self.edgeFacelet[i][1]] == self.edgeColor[j][0]):
-                    ccRet.ep[i] = j
-                    ccRet.eo[i] = 1
-                    break
-
-        return ccRet
+        return faceletsToCubieCube(self.f)
+
+
+def _cornerLookup():
+    """Map the colors at the three facelets of a corner position, in the
+    order of cornerFacelet, to the cornercubie there and its orientation,
+    for all 6^3 color triples. A cubie is found from its colors after the
+    U/D one and a triple of no cubie gives URF with orientation 0.
+    """
+    ret = {}
+    for col in product(range(6), repeat=3):
+        for ori in range(3):
+            if col[ori] == U or col[ori] == D:
+                break
+        ret[col] = (URF, 0)
+        for j in corner_values:
+            if (col[(ori + 1) % 3] == FaceCube.cornerColor[j][1]
+                    and col[(ori + 2) % 3] == FaceCube.cornerColor[j][2]):
+                ret[col] = (j, ori % 3)
+                break
+    return ret
+
+
+def _edgeLookup():
+    """Map the colors at the two facelets of an edge position, in the order
+    of edgeFacelet, to the edgecubie there and its orientation, for all 6^2
+    color pairs. A pair of no cubie gives UR with orientation 0.
+    """
+    ret = {}
+    for col in product(range(6), repeat=2):
+        ret[col] = (UR, 0)
+        for j in edge_values:
+            if col == tuple(FaceCube.edgeColor[j]):
+                ret[col] = (j, 0)
+                break
+            if col == tuple(FaceCube.edgeColor[j][::-1]):
+                ret[col] = (j, 1)
+                break
+    return ret
+
+
+cornerLookup = _cornerLookup()
+edgeLookup = _edgeLookup()
+
+
+# Gives CubieCube representation of a list of 54 facelet colors
+def faceletsToCubieCube(f):
+    from .cubiecube import CubieCube
+
+    ccRet = CubieCube()
+    cp, co, ep, eo = ccRet.cp, ccRet.co, ccRet.ep, ccRet.eo
+    for i, (a, b, c) in enumerate(FaceCube.cornerFacelet):
+        cp[i], co[i] = cornerLookup[f[a], f[b], f[c]]
+    for i, (a, b) in enumerate(FaceCube.edgeFacelet):
+        ep[i], eo[i] = edgeLookup[f[a], f[b]]
+    return ccRet
@@ -1,8 +1,88 @@
-import time
+import multiprocessing
+import threading
 from builtins import range
+from collections import namedtuple
 from .color import colors
-from .facecube import FaceCube
-from .coordcube import CoordCube, getPruning
+from .facecube import faceletsToCubieCube
+from .coordcube import CoordCube
+from .cubiecube import CubieCube
+from ...stopwatch import Stopwatch, now
+
+# Number of nodes expanded between two reads of the clock, a power of 2
+CHECK_INTERVAL = 1024
+
+# Number of phase2 start states remembered as failed before the cache is emptied
+FAILED_CACHE_SIZE = 4096
+
+# The outcome of Search.run: the solution string or error code, the number of nodes expanded in both phases, the
+# phase1 depth reached and the seconds taken.
+SearchResult = namedtuple('SearchResult', ['solution', 'nodes', 'depthPhase1', 'elapsed'])
+
+
+class SearchStats(object):
+    """
+    Counters of the work done by the searches it is passed to, added up over every search. Searches given no stats
+    only test for it when phase2 is entered and when the phase1 depth grows.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all counts gathered so far."""
+        self.searches = 0       # searches run, not counting invalid cubes
+        self.solved = 0
+        self.timedOut = 0
+        self.nodesPerDepth = []  # nodes of both phases expanded while phase1 searched at each depth
+        self.phase2Calls = 0    # times phase2 was entered
+        self.phase2Pruned = 0   # phase2 entries cut at once by the phase2 pruning tables or the cache of failures
+        self.phase2Nodes = 0
+        self.phase2Time = 0.0
+        self.elapsed = 0.0
+
+    def addDepth(self, depth, nodes):
+        """Add the nodes expanded while phase1 searched at depth."""
+        while len(self.nodesPerDepth) <= depth:
+            self.nodesPerDepth.append(0)
+        self.nodesPerDepth[depth] += nodes
+
+    def addPhase2(self, result, nodes, seconds):
+        """Add an entry into phase2 which returned result after expanding nodes in seconds."""
+        self.phase2Calls += 1
+        self.phase2Nodes += nodes
+        self.phase2Time += seconds
+        if result < 0 and nodes == 0:
+            self.phase2Pruned += 1
+
+    def addSearch(self, solved, timedOut, seconds):
+        """Add a finished search."""
+        self.searches += 1
+        self.solved += solved
+        self.timedOut += timedOut
+        self.elapsed += seconds
+
+    def nodes(self):
+        """Return the number of nodes expanded in both phases."""
+        return sum(self.nodesPerDepth)
+
+    def phase1Nodes(self):
+        return self.nodes() - self.phase2Nodes
+
+    def phase1Time(self):
+        return self.elapsed - self.phase2Time
+
+    def pruneRate(self):
+        """Return the fraction of phase2 entries cut at once by the pruning tables or the cache of failures."""
+        return self.phase2Pruned / self.phase2Calls if self.phase2Calls else 0.0
+
+    def nodesPerSecond(self):
+        return self.nodes() / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return ('%d searches (%d solved, %d timed out) in %.2f s, phase1 %d nodes in %.2f s, '
+                'phase2 entered %d times (%.1f%% pruned at once) %d nodes in %.2f s, %.0f nodes/s') % (
+            self.searches, self.solved, self.timedOut, self.elapsed, self.phase1Nodes(), self.phase1Time(),
+            self.phase2Calls, 100 * self.pruneRate(), self.phase2Nodes, self.phase2Time, self.nodesPerSecond())
 
 
 class Search(object):
@@ -11,7 +91,9 @@ class Search(object):
     ax_to_s = ["U", "R", "F", "D", "L", "B"]
     po_to_s = [None, " ", "2 ", "' "]
 
-    def __init__(self):
+    def __init__(self, stats=None):
+        """stats - a SearchStats to add the work of every search to, or None"""
+        self.stats           = stats
         self.ax              = [0] * 31  # The axis of the move
         self.po              = [0] * 31  # The power of the move
         self.flip            = [0] * 31  # phase1 coordinates
@@ -25,6 +107,14 @@ class Search(object):
         self.URtoDF          = [0] * 31
         self.minDistPhase1   = [0] * 31  # IDA* distance do goal estimations
         self.minDistPhase2   = [0] * 31
+        self.nodes           = 0     # nodes expanded by the last search
+        self.depthPhase1     = 0     # phase1 depth reached by the last search
+        self.deadline        = None  # now() at which the search gives up
+        self.cancelled       = None  # a function returning whether to give up before the deadline, or None
+        self.timedOut        = False
+        self.depthStart      = 0     # nodes expanded when phase1 started the current depth
+        self.valid           = 0     # phase2 coordinates are up to date with the phase1 moves up to this index
+        self.failed          = {}    # phase2 start state -> largest phase2 depth proven not to solve it
 
     def solutionToString(self, length, depthPhase1=None):
         """generate the solution string from the array data"""
@@ -37,12 +127,13 @@ class Search(object):
                 s += ". "
         return s
 
-    def solution(self, facelets, maxDepth, timeOut, useSeparator):
+    def solution(self, facelets, maxDepth, timeOut, useSeparator, maxPhase2=10, firstMoves=None):
         """
         Computes the solver string for a given cube.
 
         @param facelets
-                 is the cube definition string, see {@link Facelet} for the format.
+                 is the cube definition string, see {@link Facelet} for the format, or a CubieCube, which skips
+                 reading the colors.
 
         @param maxDepth
                  defines the maximal allowed maneuver length. For random cubes, a maxDepth of 21 usually will return a
@@ -50,12 +141,21 @@ class Search(object):
                  solution, but it may take much longer for specific cubes.
 
         @param timeOut
-                 defines the maximum computing time of the method in seconds. If it does not return with a solution, it returns with
-                 an error code.
+                 defines the maximum computing time of the method in seconds, or 0 for none. The clock is read every
+                 CHECK_INTERVAL nodes, so fractions of a second are honoured. If it does not return with a solution, it
+                 returns with an error code.
 
         @param useSeparator
                  determines if a " . " separates the phase1 and phase2 parts of the solver string like in F' R B R L2 F .
                  U2 U D for example.<br>
+
+        @param maxPhase2
+                 is the maximal length of the phase2 part. Allowing a longer phase2 finds a solution sooner at the
+                 cost of a move or two.<br>
+
+        @param firstMoves
+                 restricts the first move of phase1 to these move numbers 3 * axis + power - 1, or None for any move.
+                 Cubes already in the H-subgroup first try phase2 alone, within maxPhase2 moves, which ignores it.<br>
         @return The solution string or an error code:<br>
                 Error 1: There is not exactly one facelet of each colour<br>
                 Error 2: Not all 12 edges exist exactly once<br>
@@ -66,22 +166,36 @@ class Search(object):
                 Error 7: No solution exists for the given maxDepth<br>
                 Error 8: Timeout, no solution within given time
         """
+        if self.stats is None:
+            return self._solution(facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves)
+
+        watch = Stopwatch()
+        res = self._solution(facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves)
+        if res not in ("Error %d" % i for i in range(1, 7)):
+            self.stats.addDepth(self.depthPhase1, self.nodes - self.depthStart)
+            self.stats.addSearch(not res.startswith("Error"), res == "Error 8", watch.seconds())
+        return res
+
+    def _solution(self, facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves):
+        """Computes the solver string, see solution."""
 
         # +++++++++++++++++++++check for wrong input +++++++++++++++++++++++++++++
-        count = [0] * 6
-        try:
-            for i in range(54):
-                assert facelets[i] in colors
-                count[colors[facelets[i]]] += 1
-        except Exception:
-            return "Error 1"
-
-        for i in range(6):
-            if count[i] != 9:
+        if isinstance(facelets, CubieCube):
+            cc = facelets
+        else:
+            count = [0] * 6
+            try:
+                f = [colors[facelets[i]] for i in range(54)]
+            except Exception:
                 return "Error 1"
+            for c in f:
+                count[c] += 1
+
+            for i in range(6):
+                if count[i] != 9:
+                    return "Error 1"
 
-        fc = FaceCube(facelets)
-        cc = fc.toCubieCube()
+            cc = faceletsToCubieCube(f)
         s = cc.verify()
         if s != 0:
             return "Error %s" % abs(s)
@@ -106,7 +220,27 @@ class Search(object):
         busy = False
         depthPhase1 = 1
 
-        tStart = time.time()
+        self.nodes = 0
+        self.depthStart = 0
+        self.valid = 0
+        self.failed = {}
+        self.depthPhase1 = depthPhase1
+        self.deadline = now() + int(timeOut * 1e9) if timeOut > 0 else None
+        self.timedOut = False
+
+        # +++++++++++++++ cubes already in H try phase2 alone first ++++++++++++++++
+        if c.flip == 0 and c.twist == 0 and self.slice[0] == 0:
+            self.depthPhase1 = 0
+            s = self.phase2(0, maxDepth, maxPhase2)
+            if s >= 0:
+                return self.solutionToString(s)
+            if self.timedOut:
+                return "Error 8"
+            self.ax[0] = self.po[0] = 0
+            if self.stats is not None:
+                self.stats.addDepth(0, self.nodes)
+                self.depthStart = self.nodes
+            self.depthPhase1 = depthPhase1
 
         # +++++++++++++++++++ Main loop ++++++++++++++++++++++++++++++++++++++++++
         while True:
@@ -126,15 +260,15 @@ class Search(object):
                             # increment axis
                             self.ax[n] += 1
                             if self.ax[n] > 5:
-
-                                if timeOut > 0 and time.time() - tStart > timeOut:
-                                    return "Error 8"
-
                                 if n == 0:
                                     if depthPhase1 >= maxDepth:
                                         return "Error 7"
                                     else:
+                                        if self.stats is not None:
+                                            self.stats.addDepth(depthPhase1, self.nodes - self.depthStart)
+                                            self.depthStart = self.nodes
                                         depthPhase1 += 1
+                                        self.depthPhase1 = depthPhase1
                                         self.ax[n] = 0
                                         self.po[n] = 1
                                         busy = False
@@ -157,26 +291,33 @@ class Search(object):
 
             # +++++++++++++ compute new coordinates and new minDistPhase1 ++++++++++
             # if minDistPhase1 =0, the H subgroup is reached
+            self.nodes += 1
+            if self.nodes & (CHECK_INTERVAL - 1) == 0 and self.expired():
+                return "Error 8"
+            if self.valid > n:
+                self.valid = n
             mv = 3 * self.ax[n] + self.po[n] - 1
             self.flip[n + 1] = CoordCube.flipMove[self.flip[n]][mv]
             self.twist[n + 1] = CoordCube.twistMove[self.twist[n]][mv]
             self.slice[n + 1] = CoordCube.FRtoBR_Move[self.slice[n] * 24][mv] // 24
             self.minDistPhase1[n + 1] = max(
-                getPruning(
-                    CoordCube.Slice_Flip_Prun,
+                CoordCube.Slice_Flip_Prun[
                     CoordCube.N_SLICE1 * self.flip[n + 1] + self.slice[n + 1]
-                ),
-                getPruning(
-                    CoordCube.Slice_Twist_Prun,
+                ],
+                CoordCube.Slice_Twist_Prun[
                     CoordCube.N_SLICE1 * self.twist[n + 1] + self.slice[n + 1]
-                )
+                ]
             )
+            if n == 0 and firstMoves is not None and mv not in firstMoves:
+                self.minDistPhase1[1] = 99  # never descend below a first move of another branch
             # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
             if self.minDistPhase1[n + 1] == 0 and n >= depthPhase1 - 5:
                 self.minDistPhase1[n + 1] = 10  # instead of 10 any value >5 is possible
                 if n == depthPhase1 - 1:
-                    s = self.totalDepth(depthPhase1, maxDepth)
+                    s = self.phase2(depthPhase1, maxDepth, maxPhase2)
+                    if self.timedOut:
+                        return "Error 8"
                     if s >= 0:
                         if (s == depthPhase1
                             or (
@@ -184,40 +325,61 @@ class Search(object):
                                 and self.ax[depthPhase1 - 1] != self.ax[depthPhase1] + 3)):
                             return self.solutionToString(s, depthPhase1) if useSeparator else self.solutionToString(s)
 
-    def totalDepth(self, depthPhase1, maxDepth):
+    def run(self, facelets, maxDepth, timeOut, useSeparator, maxPhase2=10, firstMoves=None):
+        """Computes the solver string like solution and returns it in a SearchResult with the work done."""
+        watch = Stopwatch()
+        res = self.solution(facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves)
+        return SearchResult(res, self.nodes, self.depthPhase1, watch.seconds())
+
+    def expired(self):
+        """Return whether the deadline of the current search has passed or the search was cancelled."""
+        return ((self.deadline is not None and now() > self.deadline)
+                or (self.cancelled is not None and self.cancelled()))
+
+    def phase2(self, depthPhase1, maxDepth, maxPhase2):
+        """Call totalDepth, adding it to the stats if there are any."""
+        if self.stats is None:
+            return self.totalDepth(depthPhase1, maxDepth, maxPhase2)
+
+        nodes = self.nodes
+        watch = Stopwatch()
+        s = self.totalDepth(depthPhase1, maxDepth, maxPhase2)
+        self.stats.addPhase2(s, self.nodes - nodes, watch.seconds())
+        return s
+
+    def totalDepth(self, depthPhase1, maxDepth, maxPhase2=10):
         """
         Apply phase2 of algorithm and return the combined phase1 and phase2 depth. In phase2, only the moves
-        U,D,R2,F2,L2 and B2 are allowed.
+        U,D,R2,F2,L2 and B2 are allowed. Returns -1 if there is none, setting timedOut if the deadline passed.
+
+        The phase2 coordinates are only brought up to date from the first phase1 move which changed since the last
+        call, and start states which phase2 already failed to solve within as many moves are skipped.
         """
 
         mv = 0
         d1 = 0
         d2 = 0
-        maxDepthPhase2 = min(10, maxDepth - depthPhase1)    # Allow only max 10 moves in phase2
-        for i in range(depthPhase1):
+        maxDepthPhase2 = min(maxPhase2, maxDepth - depthPhase1)    # Allow only max 10 moves in phase2 by default
+        for i in range(self.valid, depthPhase1):
             mv = 3 * self.ax[i] + self.po[i] - 1
             self.URFtoDLF[i + 1] = CoordCube.URFtoDLF_Move[self.URFtoDLF[i]][mv]
             self.FRtoBR[i + 1] = CoordCube.FRtoBR_Move[self.FRtoBR[i]][mv]
             self.parity[i + 1] = CoordCube.parityMove[self.parity[i]][mv]
+            self.URtoUL[i + 1] = CoordCube.URtoUL_Move[self.URtoUL[i]][mv]
+            self.UBtoDF[i + 1] = CoordCube.UBtoDF_Move[self.UBtoDF[i]][mv]
+        self.valid = depthPhase1
 
-        d1 = getPruning(
-            CoordCube.Slice_URFtoDLF_Parity_Prun,
+        d1 = CoordCube.Slice_URFtoDLF_Parity_Prun[
             (CoordCube.N_SLICE2 * self.URFtoDLF[depthPhase1] + self.FRtoBR[depthPhase1]) * 2 + self.parity[depthPhase1]
-        )
+        ]
         if d1 > maxDepthPhase2:
             return -1
 
-        for i in range(depthPhase1):
-            mv = 3 * self.ax[i] + self.po[i] - 1
-            self.URtoUL[i + 1] = CoordCube.URtoUL_Move[self.URtoUL[i]][mv]
-            self.UBtoDF[i + 1] = CoordCube.UBtoDF_Move[self.UBtoDF[i]][mv]
-
         self.URtoDF[depthPhase1] = CoordCube.MergeURtoULandUBtoDF[self.URtoUL[depthPhase1]][self.UBtoDF[depthPhase1]]
 
-        d2 = getPruning(
-            CoordCube.Slice_URtoDF_Parity_Prun,
+        d2 = CoordCube.Slice_URtoDF_Parity_Prun[
             (CoordCube.N_SLICE2 * self.URtoDF[depthPhase1] + self.FRtoBR[depthPhase1]) * 2 + self.parity[depthPhase1]
-        )
+        ]
         if d2 > maxDepthPhase2:
             return -1
 
@@ -225,6 +387,10 @@ class Search(object):
         if self.minDistPhase2[depthPhase1] == 0:    # already solved
             return depthPhase1
 
+        start = (self.URFtoDLF[depthPhase1], self.FRtoBR[depthPhase1], self.parity[depthPhase1], self.URtoDF[depthPhase1])
+        if self.failed.get(start, -1) >= maxDepthPhase2:
+            return -1
+
         # now set up search
 
         depthPhase2 = 1
@@ -261,6 +427,9 @@ class Search(object):
                             if self.ax[n] > 5:
                                 if n == depthPhase1:
                                     if depthPhase2 >= maxDepthPhase2:
+                                        if len(self.failed) >= FAILED_CACHE_SIZE:
+                                            self.failed.clear()
+                                        self.failed[start] = maxDepthPhase2
                                         return -1
                                     else:
                                         depthPhase2 += 1
@@ -289,6 +458,10 @@ class Search(object):
                     break
 
             # +++++++++++++ compute new coordinates and new minDist ++++++++++
+            self.nodes += 1
+            if self.nodes & (CHECK_INTERVAL - 1) == 0 and self.expired():
+                self.timedOut = True
+                return -1
             mv = 3 * self.ax[n] + self.po[n] - 1
 
             self.URFtoDLF[n + 1] = CoordCube.URFtoDLF_Move[self.URFtoDLF[n]][mv]
@@ -297,14 +470,12 @@ class Search(object):
             self.URtoDF[n + 1] = CoordCube.URtoDF_Move[self.URtoDF[n]][mv]
 
             self.minDistPhase2[n + 1] = max(
-                getPruning(
-                    CoordCube.Slice_URtoDF_Parity_Prun,
+                CoordCube.Slice_URtoDF_Parity_Prun[
                     (CoordCube.N_SLICE2 * self.URtoDF[n + 1] + self.FRtoBR[n + 1]) * 2 + self.parity[n + 1]
-                ),
-                getPruning(
-                    CoordCube.Slice_URFtoDLF_Parity_Prun,
+                ],
+                CoordCube.Slice_URFtoDLF_Parity_Prun[
                     (CoordCube.N_SLICE2 * self.URFtoDLF[n + 1] + self.FRtoBR[n + 1]) * 2 + self.parity[n + 1]
-                )
+                ]
             )
             # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
@@ -312,3 +483,74 @@ class Search(object):
                 break
 
         return depthPhase1 + depthPhase2
+
+
+# Process pools of parallelSolution by their number of processes, kept alive between calls
+_pools = {}
+_poolsLock = threading.Lock()
+
+# The number of the current parallelSolution, shared with every worker process. The branches of an earlier call give
+# up at their next check of the clock.
+_generation = None
+
+
+def _initWorker(generation):
+    """Keep the shared call number in a new worker process."""
+    global _generation
+    _generation = generation
+
+
+def _pool(processes):
+    """Return the pool of the given number of processes, starting it on first use."""
+    global _generation
+    if _generation is None:
+        _generation = multiprocessing.Value('L', 0)
+    if processes not in _pools:
+        _pools[processes] = multiprocessing.Pool(processes, _initWorker, (_generation,))
+    return _pools[processes]
+
+
+def _branchSolution(args):
+    """Search one branch of parallelSolution in a worker process."""
+    facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves, generation = args
+    search = Search()
+    search.cancelled = lambda: _generation.value != generation
+    return search.solution(facelets, maxDepth, timeOut, useSeparator, maxPhase2, firstMoves)
+
+
+def parallelSolution(facelets, maxDepth, timeOut, useSeparator, maxPhase2=10, processes=None):
+    """
+    Computes the solver string like Search.solution, with the phase1 search split by its first move across a pool of
+    processes. Each process deepens its own share of the 18 first moves and the first solution found is returned, after
+    which the other branches are cancelled. The pool of each number of processes is started on first use and kept for
+    later calls, which run one at a time. Forked processes share the tables already loaded by the parent.
+
+    @param processes
+             is the number of processes, by default the number of CPUs. At most 18 are used and with 1 the search runs
+             in this process.<br>
+    @return The solution string or an error code as in Search.solution. Error 8 is returned if every branch failed and
+            any of them timed out.
+    """
+    processes = min(processes or multiprocessing.cpu_count(), 18)
+    if processes <= 1:
+        return Search().solution(facelets, maxDepth, timeOut, useSeparator, maxPhase2)
+
+    with _poolsLock:
+        pool = _pool(processes)
+        with _generation.get_lock():
+            _generation.value += 1
+            generation = _generation.value
+        branches = [
+            (facelets, maxDepth, timeOut, useSeparator, maxPhase2, tuple(range(i, 18, processes)), generation)
+            for i in range(processes)
+        ]
+        try:
+            errors = []
+            for res in pool.imap_unordered(_branchSolution, branches):
+                if not res.startswith("Error"):
+                    return res
+                errors.append(res)
+        finally:
+            with _generation.get_lock():
+                _generation.value += 1  # cancel the branches still running
+    return "Error 8" if "Error 8" in errors else errors[0]
@@ -1,7 +1,7 @@
 import random
 from builtins import range
 
-from .facecube import FaceCube
+from .facecube import FaceCube, faceletsToCubieCube
 from .cubiecube import CubieCube
 from .coordcube import CoordCube
 from .color import colors
@@ -22,35 +22,34 @@ def verify(s):
     """
     count = [0] * 6     # new int[6]
     try:
-        for i in range(54):
-            assert s[i] in colors
-            count[colors[s[i]]] += 1
+        f = [colors[s[i]] for i in range(54)]
     except:
         return -1
+    for c in f:
+        count[c] += 1
 
     for i in range(6):
         if count[i] != 9:
             return -1
 
-    fc = FaceCube(s)
-    cc = fc.toCubieCube()
+    cc = faceletsToCubieCube(f)
 
     return cc.verify()
 
 
-def randomCube():
+def randomCube(rng=random):
     """
-    Generates a random cube.
+    Generates a random cube, drawing from rng, a random.Random or the random module.
     @return A random cube in the string representation. Each cube of the cube space has the same probability.
     """
     cc = CubieCube()
-    cc.setFlip(random.randint(0, CoordCube.N_FLIP - 1))
-    cc.setTwist(random.randint(0, CoordCube.N_TWIST - 1))
-    while True:
-        cc.setURFtoDLB(random.randint(0, CoordCube.N_URFtoDLB - 1))
-        cc.setURtoBR(random.randint(0, CoordCube.N_URtoBR - 1))
-
-        if (cc.edgeParity() ^ cc.cornerParity()) == 0:
-            break
+    cc.setFlip(rng.randint(0, CoordCube.N_FLIP - 1))
+    cc.setTwist(rng.randint(0, CoordCube.N_TWIST - 1))
+    cc.setURFtoDLB(rng.randint(0, CoordCube.N_URFtoDLB - 1))
+    idx = rng.randint(0, CoordCube.N_URtoBR - 1)
+    cc.setURtoBR(idx)
+    if (cc.edgeParity() ^ cc.cornerParity()) != 0:
+        # the last digit of the index is one rotation of two edges, so idx ^ 1 has the other parity
+        cc.setURtoBR(idx ^ 1)
     fc = cc.toFaceCube()
     return fc.to_String()
@@ -0,0 +1,438 @@
+'''
+##revenge.py
+This module generates random-state scrambles for the 4x4x4 cube by
+reduction. A uniformly random state is solved in five phases and the
+inverse of the solution is returned as the scramble.
+
+1. The eight R and L centers are moved onto the R and L faces.
+2. Keeping them there, the U and D centers are moved onto U and D.
+3. Keeping every center on its axis, all centers are solved.
+4. Edge pieces are paired into dedges with short center preserving
+   algorithms, fixing the lone flipped dedge parity if it comes up.
+5. The reduced cube is solved as a 3x3x3 with the two-phase search,
+   after swapping two dedges if the permutation parity calls for it.
+
+The three center phases each have an exact distance table, filled by a
+breadth first search and cached to disk alongside the two-phase tables,
+so they are solved optimally by descending the table. Edge pairing is a
+greedy search over short setups of outer turns followed by one of a few
+pairing algorithms.
+
+The cube is modelled as a list of 96 sticker colors in the order of
+Cube.kociemba_str, and every move is a permutation of those stickers
+taken from Cube.apply_turn itself. Even cubes have no fixed centers, so
+solved is taken to mean every sticker has the color of its face.
+'''
+
+from .pykociemba.coordcube import load_cachetable, dump_cachetable
+from .pykociemba.facecube import FaceCube
+from .pykociemba.search import Search
+from .scramble import MAX_DEPTH
+from .solve import errors
+from .turn import Turn
+from .. import TurnSequence
+from ..stopwatch import Stopwatch
+
+from math import comb
+import random
+import logging
+
+log = logging.getLogger(__name__)
+
+FACES = 'URFDLB'
+U, R, F, D, L, B = range(6)
+
+N_CENTER1 = 735471  # C(24,8) places for the R and L centers
+N_CENTER3 = 343000  # C(8,4)^3 ways to split the centers of each axis
+MAX_PHASE2 = 14     # longest phase 2 of the two-phase search of the reduced cube
+
+outer_moves = [f + p for f in FACES for p in ('', '2', '\'')]
+wide_moves = [f + 'w' + p for f in 'URF' for p in ('', '2', '\'')]
+
+# Move sets of the center phases. Each keeps the previous phases solved.
+center1_moves = outer_moves + wide_moves
+center2_moves = outer_moves + ['Rw', 'Rw2', 'Rw\'', 'Uw2', 'Fw2']
+center3_moves = outer_moves + ['Uw2', 'Rw2', 'Fw2']
+
+# Edge pairing algorithms. Each keeps solved centers solved. The first two
+# pair one dedge and the others can pair two at once.
+pairing_algs = [
+    'Uw L\' U L Uw\'',
+    'Uw\' R U\' R\' Uw',
+    'Dw R F\' U R\' F Dw\'',
+    'Dw\' L\' F U\' L F\' Dw',
+    'Uw R U R\' F R\' F\' R Uw\'',
+    'Uw\' L\' U\' L F\' L F L\' Uw',
+]
+
+# Flips one dedge, leaving the centers and the other dedges paired.
+oll_parity = 'Rw2 B2 U2 Lw U2 Rw\' U2 Rw U2 F2 Rw F2 Lw\' B2 Rw2'
+
+# Odd permutation of the dedges, leaving the centers and the pairs intact.
+pll_parity = 'Rw2 R2 U2 Rw2 R2 Uw2 Rw2 R2 Uw2'
+
+def _stickerMove(sequence):
+    """Return the sticker permutation of a sequence of turns. Applying it
+    to a state s gives [s[i] for i in perm].
+    """
+    from . import Cube
+    cube = Cube(4)
+    for k, f in enumerate('URFDL'):
+        cube.faces[f] = [[16*k + 4*r + q for q in range(4)] for r in range(4)]
+    cube.faces['B'] = Cube.rotate_2([[80 + 4*r + q for q in range(4)] for r in range(4)])
+    return cube.apply(sequence).stickers()
+
+def _compose(*perms):
+    """Return the permutation applying the given permutations in order."""
+    ret = list(range(96))
+    for p in perms:
+        ret = [ret[i] for i in p]
+    return ret
+
+stickerMove = dict((m, _stickerMove(m)) for m in outer_moves + [f + 'w' + p for f in FACES for p in ('', '2', '\'')])
+
+# Two stickers belong to the same piece exactly when the same layers move them.
+_pieces = dict()
+for i in range(96):
+    key = tuple(stickerMove[f + w][i] != i for f in FACES for w in ('', 'w'))
+    _pieces.setdefault(key, []).append(i)
+
+centers = sorted(p[0] for p in _pieces.values() if len(p) == 1)
+
+# Wings as (primary, secondary) stickers. The primary sticker is on U or D,
+# or on F or B for the middle layer, as for edges in facecube.py.
+wings = []
+for p in sorted(p for p in _pieces.values() if len(p) == 2):
+    if p[1] // 16 in (U, D) or (p[0] // 16 not in (U, D) and p[1] // 16 in (F, B)):
+        p.reverse()
+    wings.append(tuple(p))
+
+# The two wings of each dedge.
+dedges = []
+for w in wings:
+    for v in wings:
+        if w < v and set(s // 16 for s in w) == set(s // 16 for s in v):
+            dedges.append((w, v))
+
+def _to4(facelet):
+    """Return the sticker of a 4x4x4 at the place of a 3x3x3 facelet.
+    Centers and edges map to one of their pieces.
+    """
+    face, i = divmod(facelet, 9)
+    r, c = divmod(i, 3)
+    return 16*face + 4*(r + (r == 2)) + c + (c == 2)
+
+# Whether a wing shows its colors swapped on each wing position. Wings
+# are mirror images of each other, so this is fixed for each position.
+wingFlip = [[0]*24 for w in wings]
+for k, (a, b) in enumerate(wings):
+    seen = {a: 0}
+    frontier = [a]
+    while frontier:
+        s = frontier.pop()
+        for p in stickerMove.values():
+            t = p.index(s)
+            if t not in seen:
+                seen[t] = seen[s]
+                frontier.append(t)
+    for j, (c, d) in enumerate(wings):
+        wingFlip[k][j] = int(c not in seen)
+
+# Masks of the center phases have bit i set for the ith center.
+def _maskMove(m):
+    """Return byte tables applying a move to a mask of centers."""
+    p = stickerMove[m]
+    dest = [0]*24
+    for i in range(24):
+        dest[centers.index(p[centers[i]])] = i
+    return [[sum(1 << dest[8*k + j] for j in range(8) if v >> j & 1) for v in range(256)] for k in range(3)]
+
+maskMove = dict((m, _maskMove(m)) for m in set(center1_moves + center2_moves + center3_moves))
+
+def applyMask(tables, mask):
+    """Return a mask of centers after a move."""
+    t0, t1, t2 = tables
+    return t0[mask & 0xff] | t1[mask >> 8 & 0xff] | t2[mask >> 16]
+
+_popcount = [bin(v).count('1') for v in range(256)]
+
+# rank8[k][c][v] is the part of the rank of an 8 center mask from byte k
+# having value v, with c bits set below it.
+rank8 = [[[sum(comb(8*k + j, c + _popcount[v & ((1 << j) - 1)] + 1) for j in range(8) if v >> j & 1)
+        for v in range(256)] for c in range(9)] for k in range(3)]
+
+def rank(mask):
+    """Return the rank of a mask of 8 centers. 0 <= rank < N_CENTER1"""
+    b0 = mask & 0xff
+    b1 = mask >> 8 & 0xff
+    return rank8[0][0][b0] + rank8[1][_popcount[b0]][b1] + rank8[2][_popcount[b0] + _popcount[b1]][mask >> 16]
+
+def faceMask(*faces):
+    """Return the mask of the centers on the given faces."""
+    return sum(0b1111 << 4*f for f in faces)
+
+# rank4[mask] is the rank of 4 centers among the 8 centers of an axis.
+rank4 = dict()
+for a, b in ((U, D), (R, L), (F, B)):
+    axis = [i for i in range(24) if i // 4 in (a, b)]
+    masks = [sum(1 << axis[j] for j in range(8) if v >> j & 1) for v in range(256) if _popcount[v] == 4]
+    rank4.update((m, r) for r, m in enumerate(masks))
+
+def center3Index(u, r, f):
+    """Return the index of the U, R and F center masks in phase 3."""
+    return (rank4[u] * 70 + rank4[r]) * 70 + rank4[f]
+
+def _bfs(name, size, goal, moves, index):
+    """Return a distance table filled by breadth first search from goal.
+    States are tuples of masks and index gives their place in the table.
+    """
+    table = load_cachetable(name)
+    if table:
+        return table
+    tables = [maskMove[m] for m in moves]
+    table = bytearray(b'\xff') * size
+    table[index(*goal)] = 0
+    frontier = [goal]
+    depth = 0
+    while frontier:
+        log.info('%s depth %d: %d states', name, depth, len(frontier))
+        nextFrontier = []
+        for state in frontier:
+            for t in tables:
+                s = tuple(applyMask(t, mask) for mask in state)
+                i = index(*s)
+                if table[i] == 0xff:
+                    table[i] = depth + 1
+                    nextFrontier.append(s)
+        frontier = nextFrontier
+        depth += 1
+    dump_cachetable(table, name)
+    return table
+
+log.info('Preparing 4x4x4 distance table for the R and L centers')
+center1Dist = _bfs('Revenge_Center1', N_CENTER1, (faceMask(R, L),), center1_moves, rank)
+
+log.info('Preparing 4x4x4 distance table for the U and D centers')
+center2Dist = _bfs('Revenge_Center2', N_CENTER1, (faceMask(U, D),), center2_moves, rank)
+
+log.info('Preparing 4x4x4 distance table for all centers')
+center3Dist = _bfs('Revenge_Center3', N_CENTER3, (faceMask(U), faceMask(R), faceMask(F)), center3_moves, center3Index)
+
+def solved():
+    """Return the solved state."""
+    return [s // 16 for s in range(96)]
+
+def apply(state, moves):
+    """Return a state after a list of moves."""
+    for m in moves:
+        state = [state[i] for i in stickerMove[m]]
+    return state
+
+def randomstate(rng = random):
+    """Return a uniformly random state drawn from rng. Each state of the
+    puzzle is drawn in all 24 of its orientations, so all are equally
+    likely.
+    """
+    state = [None] * 96
+
+    cp = list(range(8))
+    rng.shuffle(cp)
+    co = [rng.randrange(3) for i in range(7)]
+    co.append(-sum(co) % 3)
+    for i in range(8):
+        for n in range(3):
+            state[_to4(FaceCube.cornerFacelet[i][(n + co[i]) % 3])] = FaceCube.cornerColor[cp[i]][n]
+
+    wp = list(range(24))
+    rng.shuffle(wp)
+    for j, k in enumerate(wp):
+        colors = [s // 16 for s in wings[k]]
+        if wingFlip[k][j]:
+            colors.reverse()
+        state[wings[j][0]], state[wings[j][1]] = colors
+
+    colors = [i // 4 for i in range(24)]
+    rng.shuffle(colors)
+    for i, s in enumerate(centers):
+        state[s] = colors[i]
+
+    return state
+
+def _centerMask(state, *colors):
+    """Return the mask of the centers with any of the given colors."""
+    return sum(1 << i for i, s in enumerate(centers) if state[s] in colors)
+
+def _descend(table, moves, masks, index):
+    """Return an optimal path to solved in a distance table of center masks."""
+    ret = []
+    d = table[index(*masks)]
+    while d > 0:
+        for m in moves:
+            s = tuple(applyMask(maskMove[m], x) for x in masks)
+            if table[index(*s)] < d:
+                break
+        ret.append(m)
+        masks = s
+        d -= 1
+    return ret
+
+def solveCenters(state):
+    """Return optimal solutions of the three center phases in turn."""
+    moves = _descend(center1Dist, center1_moves, (_centerMask(state, R, L),), rank)
+    state = apply(state, moves)
+    ret = moves
+    moves = _descend(center2Dist, center2_moves, (_centerMask(state, U, D),), rank)
+    state = apply(state, moves)
+    ret += moves
+    masks = (_centerMask(state, U), _centerMask(state, R), _centerMask(state, F))
+    return ret + _descend(center3Dist, center3_moves, masks, center3Index)
+
+# Stickers of the dedges, first wings then second wings, each primary
+# stickers then secondary stickers. A state s is paired where
+# s[i] == s[i + 12] and s[i + 24] == s[i + 36].
+_pairStickers = [w[0][0] for w in dedges] + [w[1][0] for w in dedges] \
+        + [w[0][1] for w in dedges] + [w[1][1] for w in dedges]
+
+def paired(state):
+    """Return the number of paired dedges."""
+    s = [state[i] for i in _pairStickers]
+    return sum(1 for i in range(12) if s[i] == s[i + 12] and s[i + 24] == s[i + 36])
+
+def _setups(depth):
+    """Return every sequence of at most depth outer turns, without two
+    turns of the same face in a row.
+    """
+    ret = [[]]
+    frontier = [[]]
+    for i in range(depth):
+        frontier = [s + [m] for s in frontier for m in outer_moves if not s or s[-1][0] != m[0]]
+        ret += frontier
+    return ret
+
+def _pairingSteps(algs, depth):
+    """Return every pairing step made of a setup of at most depth outer
+    turns followed by one of algs. Steps are kept as the moves, their
+    length and the stickers they bring to the places of _pairStickers.
+    """
+    ret = []
+    for alg in algs:
+        perm = _stickerMove(alg)
+        for setup in _setups(depth):
+            p = _compose(*([stickerMove[m] for m in setup] + [perm]))
+            ret.append((setup + alg.split(), len(setup) + len(alg.split()), [p[i] for i in _pairStickers]))
+    return ret
+
+pairingSteps = _pairingSteps(pairing_algs, 2)
+lastTwoSteps = _pairingSteps(pairing_algs[2:], 3)
+
+def _pairingStep(state, n, steps):
+    """Return the moves of the step pairing the most dedges per move, or
+    None if no step pairs more than the n dedges paired already.
+    """
+    best = 0
+    for moves, length, stickers in steps:
+        s = [state[i] for i in stickers]
+        gain = sum(1 for i in range(12) if s[i] == s[i + 12] and s[i + 24] == s[i + 36]) - n
+        if gain > 0 and (not best or gain * bestLength > best * length):
+            best, bestLength, bestMoves = gain, length, moves
+    return bestMoves if best else None
+
+def pairEdges(state):
+    """Return moves pairing every dedge of a state with solved centers.
+    The last two dedges sometimes need a longer setup.
+    """
+    ret = []
+    n = paired(state)
+    while n < 12:
+        moves = _pairingStep(state, n, pairingSteps) or _pairingStep(state, n, lastTwoSteps)
+        if moves is None:
+            raise ValueError('Could not pair the remaining %d dedges' % (12 - n))
+        state = apply(state, moves)
+        ret += moves
+        n = paired(state)
+    return ret
+
+def reduced(state):
+    """Return the facelets of a reduced state as a 3x3x3."""
+    return ''.join(FACES[state[_to4(i)]] for i in range(54))
+
+_powers = {'': 1, '2': 2, '\'': 3}
+
+def _simplify(moves):
+    """Return a list of moves with consecutive turns of the same layers merged."""
+    ret = []
+    for m in moves:
+        face = m.rstrip('2\'')
+        n = _powers[m[len(face):]]
+        if ret and ret[-1][0] == face:
+            n = (n + ret.pop()[1]) % 4
+        if n:
+            ret.append((face, n))
+    return [face + ('', '', '2', '\'')[n] for face, n in ret]
+
+def reduce(state):
+    """Return a list of moves reducing a state to a 3x3x3 and the reduced
+    state. It raises ValueError if the dedges could not be paired.
+    """
+    moves = solveCenters(state)
+    state = apply(state, moves)
+    pairing = pairEdges(state)
+    state = apply(state, pairing)
+    moves += pairing
+
+    c = FaceCube(reduced(state)).toCubieCube()
+    if sum(c.eo) % 2:
+        moves += oll_parity.split()
+        state = apply(state, oll_parity.split())
+        c = FaceCube(reduced(state)).toCubieCube()
+    if c.edgeParity() != c.cornerParity():
+        moves += pll_parity.split()
+        state = apply(state, pll_parity.split())
+    return moves, state
+
+def solution(state, maxDepth = 24, timeOut = 1000):
+    """Return a list of moves solving a state. The reduced 3x3x3 is solved
+    by the two-phase search with the given maxDepth and timeOut, allowing
+    a longer phase 2 than usual since that finds a solution about twice
+    as fast for one more move.
+    """
+    moves, state = reduce(state)
+    res = Search().solution(reduced(state), maxDepth, timeOut, False, MAX_PHASE2).strip()
+    if res.startswith('Error'):
+        raise ValueError(res)
+    return _simplify(moves + res.split())
+
+def scramble(rng = random, timeOut = 10):
+    """Return a random state scramble drawn from rng. A reduced state which
+    is not solved within timeOut seconds is kept and searched again with
+    no limit, so that hard states are as likely as any other. A state
+    whose dedges could not be paired is replaced by a new one.
+    """
+    while True:
+        try:
+            moves, state = reduce(randomstate(rng))
+        except ValueError as e:
+            log.warning('Redrawing a 4x4x4 state which was not reduced: %s', e)
+            continue
+        break
+    res = Search().run(reduced(state), 24, timeOut, False, MAX_PHASE2)
+    if res.solution.startswith('Error'):
+        log.warning('%s after %.2f s and %d nodes, searching the same 4x4x4 state again without a limit',
+                    errors.get(res.solution.strip(), res.solution), res.elapsed, res.nodes)
+        res = Search().run(reduced(state), MAX_DEPTH, 0, False, MAX_PHASE2)
+    return TurnSequence(' '.join(_simplify(moves + res.solution.split())), Turn).inverse()
+
+def state(cube):
+    """Return the state of a Cube of size 4."""
+    return [FACES.index(s) for s in cube.stickers()]
+
+def solve(cube):
+    """Return a solution of a Cube of size 4, or an error message, and
+    the time taken to find it.
+    """
+    watch = Stopwatch()
+    try:
+        moves = solution(state(cube))
+    except ValueError as e:
+        return errors.get(str(e), str(e)), watch.seconds()
+    return TurnSequence(' '.join(moves), Turn), watch.seconds()
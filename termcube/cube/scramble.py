@@ -14,74 +14,281 @@ If anyone has any suggestions for speeding up the solver I would be
 very happy to know.
 '''
 
-from .pykociemba.coordcube import CoordCube, getPruning
+from .pykociemba.codec import rankPieces
+from .pykociemba.coordcube import CoordCube
 from .pykociemba.cubiecube import CubieCube
+from .pykociemba.edge import UR, UL, UB, DF, FR, BR
+from .pykociemba.search import CHECK_INTERVAL, SearchResult
+from .solve import errors
 from .. import TurnSequence
 from .turn import Turn
-from random import randrange, shuffle
+from collections import namedtuple
+import random
+import logging
 from threading import Thread
-from time import time
+from ..stopwatch import Stopwatch, now
+
+log = logging.getLogger(__name__)
 
 ax_to_s = ["U", "R", "F", "D", "L", "B"]
-po_to_s = [None, " ", "2 ", "' "]
 
-def randomstate():
-	cp = list(range(8))
-	shuffle(cp)
-	co = [randrange(3) for i in range(7)]
+# The longest solution the search arrays hold. Every state has a two-phase
+# solution this long, so a search to this depth always finds one.
+MAX_DEPTH = 30
+
+# A move is coded as 3 * axis + power - 1, with the axis as in ax_to_s and the power in quarter
+# turns, which is also its index in allMoveCube
+move_to_s = [a + d for a in ax_to_s for d in Turn.directions]
+inverse_move = [m + 2 - 2 * (m % 3) for m in range(18)]
+
+class Scramble():
+	"""A scramble of a 3x3x3 kept as bytes of move codes, one per move.
+	Its Turns, str and inverse are only made when they are asked for, so
+	a Scramble waiting in a queue is one small bytes object.
+	"""
+	__slots__ = ('codes',)
+
+	def __init__(self, codes = b''):
+		self.codes = bytes(codes)
+
+	@classmethod
+	def undoing(cls, codes):
+		"""Return the Scramble which undoes the moves with the given codes."""
+		return cls(inverse_move[m] for m in reversed(codes))
+
+	def inverse(self):
+		"""Return the Scramble that undoes this Scramble."""
+		return Scramble.undoing(self.codes)
+
+	def __len__(self):
+		return len(self.codes)
+
+	def __iter__(self):
+		"""Yield each move as a Turn."""
+		for m in self.codes:
+			yield Turn(ax_to_s[m // 3], Turn.directions[m % 3])
+
+	def __getitem__(self, i):
+		"""Return move i as a Turn, or a slice as a Scramble."""
+		if isinstance(i, slice):
+			return Scramble(self.codes[i])
+		m = self.codes[i]
+		return Turn(ax_to_s[m // 3], Turn.directions[m % 3])
+
+	def __eq__(self, other):
+		"""Return true if other is a Scramble with the same moves in the same order."""
+		if not isinstance(other, Scramble):
+			return NotImplemented
+		return self.codes == other.codes
+
+	def __hash__(self):
+		return hash(self.codes)
+
+	def to_bytes(self):
+		"""Return this Scramble encoded as by TurnSequence.to_bytes."""
+		return self.codes.translate(_turnBytes)
+
+	def __str__(self):
+		"""Return each move in notation as a single str."""
+		return ' '.join(move_to_s[m] for m in self.codes)
+
+	def __repr__(self):
+		"""Return this Scramble unambiguously"""
+		return 'Scramble(%s)' % ', '.join(move_to_s[m] for m in self.codes)
+
+# _turnBytes translates move codes to the bytes of their Turns in TurnSequence.to_bytes
+_turnBytes = TurnSequence(Scramble(range(18))).to_bytes().ljust(256, b'\0')
+
+# The coordinates of a state which the search starts from. A state
+# function may return these instead of a CubieCube.
+Coordinates = namedtuple('Coordinates', ['flip', 'twist', 'parity', 'URFtoDLF', 'FRtoBR', 'URtoUL', 'UBtoDF'])
+
+def coordinates(c):
+	"""Return the Coordinates of a CubieCube."""
+	return Coordinates(c.getFlip(), c.getTwist(), c.cornerParity(), c.getURFtoDLF(),
+		c.getFRtoBR(), c.getURtoUL(), c.getUBtoDF())
+
+def randomPermutation(n, rng = random):
+	"""Return a uniformly random permutation of range(n) as a list and
+	its parity, 0 if even and 1 if odd. It shuffles like random.shuffle
+	and counts the swaps, so no parity needs to be computed afterwards.
+	"""
+	perm = list(range(n))
+	parity = 0
+	for i in range(n - 1, 0, -1):
+		j = rng.randrange(i + 1)
+		if j != i:
+			perm[i], perm[j] = perm[j], perm[i]
+			parity ^= 1
+	return perm, parity
+
+def randomstate(rng = random):
+	cp, cornerParity = randomPermutation(8, rng)
+	co = [rng.randrange(3) for i in range(7)]
 	co.append((3 - sum(co) % 3) % 3)
 
-	ep = list(range(12))
-	shuffle(ep)
-	eo = [randrange(2) for i in range(11)]
+	ep, edgeParity = randomPermutation(12, rng)
+	eo = [rng.randrange(2) for i in range(11)]
 	eo.append(sum(eo) & 1)
 
-	c = CubieCube(cp=cp, co=co, ep=ep, eo=eo)
-	if c.edgeParity() != c.cornerParity():
-		c.ep[-1], c.ep[-2] = c.ep[-2], c.ep[-1]
-	
-	return c
-
-def lastslot():
-	cp = list(range(4)) 
-	shuffle(cp)
+	if edgeParity != cornerParity:
+		ep[-1], ep[-2] = ep[-2], ep[-1]
+
+	return CubieCube(cp=cp, co=co, ep=ep, eo=eo)
+
+def randomcoords(rng = random):
+	"""Return the Coordinates of a uniformly random state, drawn directly.
+	The twist and flip are uniform numbers. A corner permutation is the
+	places of the six corners in URFtoDLF and the order of DBL and DRB,
+	which is its parity, so both are uniform numbers too. Only the edges
+	are shuffled, with the parity of the corners, and then ranked.
+	"""
+	parity = rng.randrange(2)
+	ep, edgeParity = randomPermutation(12, rng)
+	if edgeParity != parity:
+		ep[-1], ep[-2] = ep[-2], ep[-1]
+	a, b = rankPieces(ep, FR, BR, True)
+	FRtoBR = 24 * a + b
+	a, b = rankPieces(ep, UR, UL)
+	URtoUL = 6 * a + b
+	a, b = rankPieces(ep, UB, DF)
+	UBtoDF = 6 * a + b
+	return Coordinates(rng.randrange(CoordCube.N_FLIP), rng.randrange(CoordCube.N_TWIST), parity,
+		rng.randrange(CoordCube.N_URFtoDLF), FRtoBR, URtoUL, UBtoDF)
+
+def lastslot(rng = random):
+	# The last slot piece is swapped into place with one of the last
+	# layer's, which changes the parity of the shuffle.
+	cp, cornerParity = randomPermutation(4, rng)
 	cp += list(range(4, 8))
-	i = randrange(4)
+	i = rng.randrange(4)
 	cp[i], cp[4] = cp[4], cp[i]
 	
-	co = [randrange(3) for i in range(4)] + [0]*3
+	co = [rng.randrange(3) for i in range(4)] + [0]*3
 	co.insert(4, (3 - sum(co) % 3) % 3)
 
-	ep = list(range(4))
-	shuffle(ep)
+	ep, edgeParity = randomPermutation(4, rng)
 	ep += list(range(4, 12))
 	
-	i = randrange(4)
+	i = rng.randrange(4)
 	ep[i], ep[8] = ep[8], ep[i]
 	
-	eo = [randrange(2) for i in range(4)] + [0]*8
+	eo = [rng.randrange(2) for i in range(4)] + [0]*8
 	eo[8] = sum(eo)&1
 	
-	ret = CubieCube(cp=cp, co=co, ep=ep, eo=eo)
-	if ret.edgeParity() != ret.cornerParity():
-		ret.ep[0], ret.ep[1] = ret.ep[1], ret.ep[0]
+	if edgeParity != cornerParity:
+		ep[0], ep[1] = ep[1], ep[0]
 	
-	return ret
-
-def scramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000, useSeparator = False):
-	return TurnSequence(_attemptScramble(stateFunction, maxDepth, timeOut, useSeparator), Turn).inverse()
-
-#Use keyword args
-def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000, useSeparator = False):
-	c = stateFunction()
-
-	flip            = [c.getFlip()] + [0] * 30  # phase1 coordinates
-	twist           = [c.getTwist()] + [0] * 30
-	parity          = [c.cornerParity()] + [0] * 30  # phase2 coordinates
-	URFtoDLF        = [c.getURFtoDLF()] + [0] * 30
-	FRtoBR          = [c.getFRtoBR()] + [0] * 30
-	URtoUL          = [c.getURtoUL()] + [0] * 30
-	UBtoDF          = [c.getUBtoDF()] + [0] * 30
+	return CubieCube(cp=cp, co=co, ep=ep, eo=eo)
+
+def phase1LowerBound(flip, twist, slice):
+	"""Return the pruning table lower bound on moves needed to reach H."""
+	return max(
+		CoordCube.Slice_Flip_Prun[CoordCube.N_SLICE1 * flip + slice],
+		CoordCube.Slice_Twist_Prun[CoordCube.N_SLICE1 * twist + slice]
+	)
+
+class ScrambleFilter():
+	"""Reject random states that are too close to solved and keep track
+	of how quickly acceptable scrambles are being produced.
+
+	minPhase1 rejects a state before it is searched if the phase 1
+	pruning tables prove it is fewer than that many moves from the H
+	subgroup. That bound is also a lower bound of the distance to solved,
+	so this is the only check which guarantees a minimum distance.
+	minLength rejects a state after it is searched if the solution found
+	is shorter than that many moves. A two-phase solution is not always
+	optimal, so its length is only an upper bound of the distance, and a
+	state may pass although it is closer to solved than minLength.
+	"""
+	def __init__(self, minPhase1 = 0, minLength = 0):
+		self.minPhase1 = minPhase1
+		self.minLength = minLength
+		self.reset()
+
+	def reset(self):
+		"""Forget all statistics gathered so far."""
+		self.drawn = 0
+		self.accepted = 0
+		self.rejectedPhase1 = 0
+		self.rejectedLength = 0
+		self.retried = 0
+		self.elapsed = 0.0
+
+	def acceptPhase1(self, lowerBound):
+		"""Return true if a state with the given phase 1 lower bound should be searched."""
+		self.drawn += 1
+		if lowerBound < self.minPhase1:
+			self.rejectedPhase1 += 1
+			return False
+		return True
+
+	def acceptLength(self, length):
+		"""Return true if a solution of the given length is long enough."""
+		if length < self.minLength:
+			self.rejectedLength += 1
+			return False
+		self.accepted += 1
+		return True
+
+	def retry(self):
+		"""Count a state which was not solved in its budget and is searched again."""
+		self.retried += 1
+
+	def rejected(self):
+		"""Return the number of states thrown away for either reason."""
+		return self.rejectedPhase1 + self.rejectedLength
+
+	def throughput(self):
+		"""Return the number of accepted scrambles generated per second."""
+		return self.accepted / self.elapsed if self.elapsed else 0.0
+
+	def __str__(self):
+		return '%d accepted, %d rejected (%d by phase 1 bound, %d by length), %d searched again in %.2f s, %.2f scrambles/s' % \
+			(self.accepted, self.rejected(), self.rejectedPhase1, self.rejectedLength, self.retried, self.elapsed, self.throughput())
+
+def scramble(stateFunction = randomcoords, maxDepth = 24, timeOut = 10, scrambleFilter = None, stats = None, rng = random):
+	"""Return the inverse of a solution of a state from stateFunction(rng),
+	which returns a CubieCube or its Coordinates, as a Scramble. rng is a random.Random
+	or the random module, so a seeded one gives the same scrambles every
+	time. A state which is not solved within timeOut seconds and maxDepth
+	moves is kept and searched again with neither limit, so that hard
+	states are as likely as any other. If a SearchStats is given, every
+	search is added to it.
+	"""
+	watch = Stopwatch()
+	while True:
+		c = stateFunction(rng)
+		if not isinstance(c, Coordinates):
+			c = coordinates(c)
+		if scrambleFilter is not None and not scrambleFilter.acceptPhase1(phase1LowerBound(c.flip, c.twist, c.FRtoBR // 24)):
+			continue
+		res = _attemptScramble(c, maxDepth, timeOut, stats)
+		if not isinstance(res.solution, bytes):
+			log.warning('%s after %.2f s and %d nodes, searching the same state again without a limit',
+				errors[res.solution], res.elapsed, res.nodes)
+			if scrambleFilter is not None:
+				scrambleFilter.retry()
+			res = _attemptScramble(c, MAX_DEPTH, 0, stats)
+		if scrambleFilter is None or scrambleFilter.acceptLength(len(res.solution)):
+			break
+	if scrambleFilter is not None:
+		scrambleFilter.elapsed += watch.seconds()
+	return Scramble.undoing(res.solution)
+
+def _attemptScramble(c, maxDepth = 24, timeOut = 10, stats = None):
+	"""Search for a solution of the state with the Coordinates c and return
+	a SearchResult. Its solution is the move codes as bytes, or Error 7 if
+	there is none within maxDepth moves or Error 8 if the search took over
+	timeOut seconds, 0 for no limit.
+	"""
+	flip            = [c.flip] + [0] * 30  # phase1 coordinates
+	twist           = [c.twist] + [0] * 30
+	parity          = [c.parity] + [0] * 30  # phase2 coordinates
+	URFtoDLF        = [c.URFtoDLF] + [0] * 30
+	FRtoBR          = [c.FRtoBR] + [0] * 30
+	URtoUL          = [c.URtoUL] + [0] * 30
+	UBtoDF          = [c.UBtoDF] + [0] * 30
 	slice           = [FRtoBR[0] // 24] + [0] * 30
 
 	ax              = [0] * 31  # The axis of the move
@@ -94,7 +301,11 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 	n = 0
 	busy = False
 	depthPhase1 = 1
-	tStart = time()
+	nodes = 0
+	depthStart = 0
+	watch = Stopwatch()
+	deadline = watch.start + int(timeOut * 1e9) if timeOut > 0 else None
+	timedOut = False
 
 	#~ print("twist %d flip %d parity %d FRtoBR %d URFtoDLF %d URtoUL %d UBtoDF %d" %\
 		#~ (twist[0], flip[0], parity[0], FRtoBR[0], URFtoDLF[0], URtoUL[0], UBtoDF[0]), end='')
@@ -102,39 +313,61 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 	# ++++++++++++++++++++ Define string thingy ++++++++++++++++++++++++++++++
 
 
-	def solutionToString(length, depthPhase1=None):
-		"""generate the solution string from the array data"""
-		s = ""
-		for i in range(length):
-			s += ax_to_s[ax[i]]
-			s += po_to_s[po[i]]
-			if depthPhase1 is not None and i == depthPhase1 - 1:
-				s += ". "
-		return s
+	def solutionCodes(length):
+		"""Return the move codes of the solution in the array data as bytes."""
+		return bytes(3 * ax[i] + po[i] - 1 for i in range(length))
+
 
+	def expired():
+		"""Count a node and return whether the deadline has passed, reading the clock every CHECK_INTERVAL nodes."""
+		nonlocal nodes
+		nodes += 1
+		return nodes & (CHECK_INTERVAL - 1) == 0 and deadline is not None and now() > deadline
+
+	def finish(res, depth):
+		"""Add the search, which ended at the given phase 1 depth, to stats
+		and return a SearchResult of res, the solution codes or None.
+		"""
+		elapsed = watch.seconds()
+		if stats is not None:
+			stats.addDepth(depth, nodes - depthStart)
+			stats.addSearch(res is not None, timedOut, elapsed)
+		if res is None:
+			res = 'Error 8' if timedOut else 'Error 7'
+		return SearchResult(res, nodes, depth, elapsed)
+
+	def phase2(depthPhase1, maxDepth, maxPhase2 = 10):
+		"""Call totalDepth, adding it to stats if there are any."""
+		if stats is None:
+			return totalDepth(depthPhase1, maxDepth, maxPhase2)
+		start = nodes
+		phase2Watch = Stopwatch()
+		s = totalDepth(depthPhase1, maxDepth, maxPhase2)
+		stats.addPhase2(s, nodes - start, phase2Watch.seconds())
+		return s
 
 	# ++++++++++++++++++++ Define phase two ++++++++++++++++++++++++++++++++++
 
-	def totalDepth(depthPhase1, maxDepth):
+	def totalDepth(depthPhase1, maxDepth, maxPhase2 = 10):
 		"""
 		Apply phase2 of algorithm and return the combined phase1 and phase2 depth. In phase2, only the moves
-		U,D,R2,F2,L2 and B2 are allowed.
+		U,D,R2,F2,L2 and B2 are allowed. Returns -1 if there is none, setting timedOut if the deadline passed.
 		"""
+		nonlocal timedOut
 
 		mv = 0
 		d1 = 0
 		d2 = 0
-		maxDepthPhase2 = min(10, maxDepth - depthPhase1)    # Allow only max 10 moves in phase2
+		maxDepthPhase2 = min(maxPhase2, maxDepth - depthPhase1)    # Allow only max 10 moves in phase2 by default
 		for i in range(depthPhase1):
 			mv = 3 * ax[i] + po[i] - 1
 			URFtoDLF[i + 1] = CoordCube.URFtoDLF_Move[URFtoDLF[i]][mv]
 			FRtoBR[i + 1] = CoordCube.FRtoBR_Move[FRtoBR[i]][mv]
 			parity[i + 1] = CoordCube.parityMove[parity[i]][mv]
 
-		d1 = getPruning(
-			CoordCube.Slice_URFtoDLF_Parity_Prun,
+		d1 = CoordCube.Slice_URFtoDLF_Parity_Prun[
 			(CoordCube.N_SLICE2 * URFtoDLF[depthPhase1] + FRtoBR[depthPhase1]) * 2 + parity[depthPhase1]
-		)
+		]
 		if d1 > maxDepthPhase2:
 			return -1
 
@@ -145,10 +378,9 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 
 		URtoDF[depthPhase1] = CoordCube.MergeURtoULandUBtoDF[URtoUL[depthPhase1]][UBtoDF[depthPhase1]]
 
-		d2 = getPruning(
-			CoordCube.Slice_URtoDF_Parity_Prun,
+		d2 = CoordCube.Slice_URtoDF_Parity_Prun[
 			(CoordCube.N_SLICE2 * URtoDF[depthPhase1] + FRtoBR[depthPhase1]) * 2 + parity[depthPhase1]
-		)
+		]
 		if d2 > maxDepthPhase2:
 			return -1
 
@@ -220,6 +452,9 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 					break
 
 			# +++++++++++++ compute new coordinates and new minDist ++++++++++
+			if expired():
+				timedOut = True
+				return -1
 			mv = 3 * ax[n] + po[n] - 1
 
 			URFtoDLF[n + 1] = CoordCube.URFtoDLF_Move[URFtoDLF[n]][mv]
@@ -228,14 +463,12 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 			URtoDF[n + 1] = CoordCube.URtoDF_Move[URtoDF[n]][mv]
 
 			minDistPhase2[n + 1] = max(
-				getPruning(
-					CoordCube.Slice_URtoDF_Parity_Prun,
+				CoordCube.Slice_URtoDF_Parity_Prun[
 					(CoordCube.N_SLICE2 * URtoDF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]
-				),
-				getPruning(
-					CoordCube.Slice_URFtoDLF_Parity_Prun,
+				],
+				CoordCube.Slice_URFtoDLF_Parity_Prun[
 					(CoordCube.N_SLICE2 * URFtoDLF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]
-				)
+				]
 			)
 			# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
@@ -246,6 +479,18 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 
 
 
+	# ++++++++++ States already in H try phase 2 alone first +++++++++++++++
+	if phase1LowerBound(flip[0], twist[0], slice[0]) == 0:
+		s = phase2(0, maxDepth)
+		if s >= 0:
+			return finish(solutionCodes(s), 0)
+		if timedOut:
+			return finish(None, 0)
+		ax[0] = po[0] = 0
+		if stats is not None:
+			stats.addDepth(0, nodes)
+			depthStart = nodes
+
 	# +++++++++++++++++++ Main loop ++++++++++++++++++++++++++++++++++++++++++
 	while True:
 		while True:
@@ -264,14 +509,13 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 						# increment axis
 						ax[n] += 1
 						if ax[n] > 5:
-
-							if timeOut > 0 and time() - tStart > timeOut:
-								return "Error 8"
-
 							if n == 0:
 								if depthPhase1 >= maxDepth:
-									return "Error 7"
+									return finish(None, depthPhase1)
 								else:
+									if stats is not None:
+										stats.addDepth(depthPhase1, nodes - depthStart)
+										depthStart = nodes
 									depthPhase1 += 1
 									ax[n] = 0
 									po[n] = 1
@@ -295,40 +539,42 @@ def _attemptScramble(stateFunction = randomstate, maxDepth = 24, timeOut = 1000,
 
 		# +++++++++++++ compute new coordinates and new minDistPhase1 ++++++++++
 		# if minDistPhase1 =0, the H subgroup is reached
+		if expired():
+			timedOut = True
+			return finish(None, depthPhase1)
 		mv = 3 * ax[n] + po[n] - 1
 		flip[n + 1] = CoordCube.flipMove[flip[n]][mv]
 		twist[n + 1] = CoordCube.twistMove[twist[n]][mv]
 		slice[n + 1] = CoordCube.FRtoBR_Move[slice[n] * 24][mv] // 24
 		minDistPhase1[n + 1] = max(
-			getPruning(
-				CoordCube.Slice_Flip_Prun,
+			CoordCube.Slice_Flip_Prun[
 				CoordCube.N_SLICE1 * flip[n + 1] + slice[n + 1]
-			),
-			getPruning(
-				CoordCube.Slice_Twist_Prun,
+			],
+			CoordCube.Slice_Twist_Prun[
 				CoordCube.N_SLICE1 * twist[n + 1] + slice[n + 1]
-			)
+			]
 		)
 		# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 		if minDistPhase1[n + 1] == 0 and n >= depthPhase1 - 5:
 			minDistPhase1[n + 1] = 10  # instead of 10 any value >5 is possible
 			if n == depthPhase1 - 1:
-				s = totalDepth(depthPhase1, maxDepth)
+				s = phase2(depthPhase1, maxDepth)
+				if timedOut:
+					return finish(None, depthPhase1)
 				if s >= 0:
 					if (s == depthPhase1
 						or (
 							ax[depthPhase1 - 1] != ax[depthPhase1]
 							and ax[depthPhase1 - 1] != ax[depthPhase1] + 3)):
-						return solutionToString(s, depthPhase1) if useSeparator else solutionToString(s)
+						return finish(solutionCodes(s), depthPhase1)
 
 
 def scrambleTime():
-	from time import time
 	mean = lambda arr : sum(arr)/len(arr)
 	q = []
 	while True:
-		t = time()
+		watch = Stopwatch()
 		scramble()
-		q.append(time()-t)
+		q.append(watch.seconds())
 		print(q[-1])
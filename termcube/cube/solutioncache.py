@@ -0,0 +1,186 @@
+'''
+##solutioncache.py
+This module remembers solutions of 3x3x3 cubes so that solving the same
+position again returns at once. Positions are keyed by their stickers
+in the order of kociemba_str, normalized under the 24 whole-cube
+rotations: every rotation of the cube is tried and the least string
+is the key. A cube which is a rotation of one solved before shares its
+entry, and the stored solution is turned back into its own frame by
+renaming the faces.
+
+The cache keeps the most recently used entries and can be backed by a
+file, which is read when the cache is made and written after every
+saveEvery new entries and when it is closed, at exit at the latest.
+Every Cube of size 3 shares the module's default cache unless it is
+given one of its own.
+'''
+
+from .turn import Turn
+from .. import TurnSequence
+from ..stopwatch import Stopwatch
+
+from collections import OrderedDict
+import atexit
+import logging
+import os.path
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+log = logging.getLogger(__name__)
+
+FACES = 'URFDLB'
+
+def _stickerMove(sequence):
+    """Return the sticker permutation of a sequence of turns. Applying it
+    to a state s gives [s[i] for i in perm].
+    """
+    from . import Cube
+    cube = Cube(3)
+    for k, f in enumerate('URFDL'):
+        cube.faces[f] = [[9*k + 3*r + q for q in range(3)] for r in range(3)]
+    cube.faces['B'] = Cube.rotate_2([[45 + 3*r + q for q in range(3)] for r in range(3)])
+    return cube.apply(sequence).stickers()
+
+# The sticker index of the center of each face
+centers = dict((f, 9*k + 4) for k, f in enumerate(FACES))
+
+_rotations = []
+
+def rotations():
+    """Return the 24 whole-cube rotations as sticker permutations: any
+    face may be brought to U, then any of four turns about the U axis.
+    They are derived from Cube, so only on first use.
+    """
+    if not _rotations:
+        _rotations.extend(_stickerMove(a + ' ' + b)
+                          for a in ('', 'x', 'x2', "x'", 'z', "z'") for b in ('', 'y', 'y2', "y'"))
+    return _rotations
+
+def canonical(facelets):
+    """Return the least kociemba_str of any rotation of a cube and the
+    faces of the cube which end up in each place, as a dict. facelets are
+    the stickers in the order of kociemba_str, as a str or list, and may
+    have any six names, since a sticker belongs to the face whose center
+    has the same name.
+    """
+    face = dict((facelets[centers[f]], f) for f in FACES)
+    best = None
+    for perm in rotations():
+        rename = dict((facelets[perm[centers[f]]], f) for f in FACES)
+        s = ''.join(rename[facelets[i]] for i in perm)
+        if best is None or s < best[0]:
+            best = (s, rename)
+    s, rename = best
+    return s, dict((f, face[sticker]) for sticker, f in rename.items())
+
+def _rename(moves, faceMap):
+    """Return a TurnSequence of moves, a list of str, with faces renamed by faceMap."""
+    return TurnSequence([Turn(faceMap[m[0]] + m[1:]) for m in moves])
+
+class SolutionCache():
+    """A least recently used cache of 3x3x3 solutions with hit and miss
+    counts. If path is given, entries are kept in that file too. It is
+    read when the cache is made, keeping only the maxsize most recent
+    entries, and written after every saveEvery new entries and on close.
+    """
+    def __init__(self, maxsize = 1024, path = None, saveEvery = 32):
+        self.maxsize = maxsize
+        self.path = path
+        self.saveEvery = saveEvery
+        self.entries = OrderedDict()
+        self.unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+            atexit.register(self.close)
+
+    def load(self):
+        """Read the entries of the backing file, if it exists and holds
+        entries, keeping the maxsize most recently used.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            log.warning('could not read solution cache %s: %s', self.path, e)
+            return
+        if not (isinstance(entries, dict) and all(isinstance(k, str) and isinstance(v, list) for k, v in entries.items())):
+            log.warning('solution cache %s does not hold solutions, ignoring it', self.path)
+            return
+        self.entries = OrderedDict(entries)
+        self.trim()
+
+    def trim(self):
+        """Forget the least recently used entries beyond maxsize."""
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, facelets):
+        """Return a cached solution of the cube with the given stickers,
+        as for canonical, as a TurnSequence, or None.
+        """
+        key, faceMap = canonical(facelets)
+        moves = self.entries.get(key)
+        if moves is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return _rename(moves, faceMap)
+
+    def put(self, facelets, solution):
+        """Remember a TurnSequence solving the cube with the given stickers."""
+        key, faceMap = canonical(facelets)
+        rename = dict((v, k) for k, v in faceMap.items())
+        self.entries[key] = [rename[str(t)[0]] + str(t)[1:] for t in solution]
+        self.entries.move_to_end(key)
+        self.trim()
+        self.unsaved += 1
+        if self.path is not None and self.unsaved >= self.saveEvery:
+            self.save()
+
+    def solve(self, facelets, solver):
+        """Return a solution of the cube with the given stickers and
+        the time taken, from the cache or else from solver(facelets), which
+        returns the same. Errors are not cached.
+        """
+        watch = Stopwatch()
+        solution = self.get(facelets)
+        if solution is not None:
+            return solution, watch.seconds()
+        solution, _ = solver(facelets)
+        if not isinstance(solution, str):
+            self.put(facelets, solution)
+        return solution, watch.seconds()
+
+    def save(self):
+        """Write the entries to the backing file."""
+        with open(self.path, 'wb') as f:
+            pickle.dump(self.entries, f)
+        self.unsaved = 0
+
+    def close(self):
+        """Write the entries to the backing file if any are new."""
+        if self.path is not None and self.unsaved:
+            self.save()
+
+    def clear(self):
+        """Forget every entry and the hit and miss counts."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        return '%d solutions cached, %d hits, %d misses' % (len(self.entries), self.hits, self.misses)
+
+# The cache every Cube of size 3 shares unless given its own
+default = SolutionCache()
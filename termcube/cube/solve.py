@@ -9,8 +9,7 @@ port of two-phase can be found at <https://github.com/muodov/kociemba>.
 from .turn import Turn
 from .pykociemba import search
 from .. import TurnSequence
-
-from time import time
+from ..stopwatch import Stopwatch
 
 errors = {
     'Error 1': 'There is not exactly one facelet of each colour',
@@ -23,10 +22,21 @@ errors = {
     'Error 8': 'Timeout, no solution within given time'
 }
 
-def solve(facelets, maxDepth = 24, timeOut = 1000, useSeparator = False):
-    t = time()
-    res = search.Search().solution(facelets, maxDepth, timeOut, useSeparator).strip()
+def solve(facelets, maxDepth = 24, timeOut = 1000, useSeparator = False, processes = 1, stats = None):
+    """Return a solution of the cube with the given sticker string, or
+    of a CubieCube, or an error message, and the time taken. The search gives up after timeOut
+    seconds, which may be a fraction. With more than one process the
+    phase 1 search is split by its first move across a process pool.
+    If a search.SearchStats is given, a single process search is added
+    to it.
+    """
+    watch = Stopwatch()
+    if processes == 1:
+        res = search.Search(stats).solution(facelets, maxDepth, timeOut, useSeparator)
+    else:
+        res = search.parallelSolution(facelets, maxDepth, timeOut, useSeparator, processes = processes)
+    res = res.strip()
     if res in errors:
-        return errors[res], time() - t
+        return errors[res], watch.seconds()
     else:
-        return TurnSequence(res, Turn), time() - t
+        return TurnSequence(res, Turn), watch.seconds()
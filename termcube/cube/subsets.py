@@ -0,0 +1,113 @@
+'''
+##subsets.py
+This module is a registry of state generators for subset scrambles. Each
+state generator returns a random CubieCube, or just its coordinates,
+drawn uniformly from some subset of the cube group, e.g. every last
+layer case, which is then solved with the same two-phase search used
+for full random-state scrambles in scramble.py.
+
+Subsets are registered under a short name with a description and the
+maxDepth of their search, which is the only setting tuned for a subset.
+Last layer subsets are solved in fewer moves, so they use a lower
+maxDepth. The search itself is the same for every subset: a state which
+already lies in the phase 2 subgroup tries phase 2 alone first, as every
+search does, and otherwise goes through both phases.
+'''
+
+from .pykociemba.codec import permutationParity
+from .pykociemba.cubiecube import CubieCube
+from . import scramble as _scramble
+from .scramble import randomcoords, lastslot, randomPermutation
+from collections import namedtuple
+import random
+
+Subset = namedtuple('Subset', ['name', 'description', 'stateFunction', 'maxDepth'])
+
+subsets = dict()
+
+def register(name, description, maxDepth = 24):
+	"""Register the decorated state function as a subset with the given name."""
+	def decorator(stateFunction):
+		subsets[name] = Subset(name, description, stateFunction, maxDepth)
+		return stateFunction
+	return decorator
+
+def scramble(name = 'random', scrambleFilter = None, stats = None, rng = random):
+	"""Return a random state scramble of the subset with the given name.
+	If a SearchStats is given, its searches are added to it. States are
+	drawn from rng, a random.Random or the random module.
+	"""
+	subset = subsets[name]
+	return _scramble.scramble(subset.stateFunction, subset.maxDepth, scrambleFilter = scrambleFilter, stats = stats, rng = rng)
+
+def _lastlayer(cp = None, co = True, ep = None, eo = True, rng = random):
+	"""Return a CubieCube with the first two layers solved.
+	Any of the last layer's corner permutation, corner orientation, edge
+	permutation or edge orientation that is not given is randomized.
+	"""
+	if cp is None:
+		cp, cornerParity = randomPermutation(4, rng)
+	else:
+		cornerParity = permutationParity(cp)
+	if ep is None:
+		ep, edgeParity = randomPermutation(4, rng)
+	else:
+		edgeParity = permutationParity(ep)
+
+	if co:
+		co = [rng.randrange(3) for i in range(3)]
+		co.append((3 - sum(co) % 3) % 3)
+	else:
+		co = [0]*4
+	if eo:
+		eo = [rng.randrange(2) for i in range(3)]
+		eo.append(sum(eo) & 1)
+	else:
+		eo = [0]*4
+
+	if edgeParity != cornerParity:
+		ep[0], ep[1] = ep[1], ep[0]
+
+	return CubieCube(cp=cp + list(range(4, 8)), co=co + [0]*4, ep=ep + list(range(4, 12)), eo=eo + [0]*8)
+
+register('random', 'Random state', 24)(randomcoords)
+register('lsll', 'Last slot and last layer', 20)(lastslot)
+
+@register('ll', 'Last layer', 20)
+def lastlayer(rng = random):
+	return _lastlayer(rng = rng)
+
+@register('zbll', 'Last layer with all edges oriented', 20)
+def zbll(rng = random):
+	return _lastlayer(eo = False, rng = rng)
+
+@register('2gll', 'Last layer solvable with only R and U, corners permuted up to AUF', 20)
+def twogll(rng = random):
+	k = rng.randrange(4)
+	return _lastlayer(cp = [(i + k) % 4 for i in range(4)], eo = False, rng = rng)
+
+@register('pll', 'Last layer permutation', 20)
+def pll(rng = random):
+	return _lastlayer(co = False, eo = False, rng = rng)
+
+@register('corners', 'Corners only, all edges solved', 24)
+def corners(rng = random):
+	cp, parity = randomPermutation(8, rng)
+	co = [rng.randrange(3) for i in range(7)]
+	co.append((3 - sum(co) % 3) % 3)
+
+	if parity:
+		cp[0], cp[1] = cp[1], cp[0]
+
+	return CubieCube(cp=cp, co=co)
+
+@register('edges', 'Edges only, all corners solved', 24)
+def edges(rng = random):
+	ep, parity = randomPermutation(12, rng)
+	eo = [rng.randrange(2) for i in range(11)]
+	eo.append(sum(eo) & 1)
+
+	if parity:
+		ep[0], ep[1] = ep[1], ep[0]
+
+	return CubieCube(ep=ep, eo=eo)
@@ -8,7 +8,9 @@ A can return a TurnSequence B that undoes A. They can also produce
 random turn scrambles.
 '''
 
-from random import choice, randrange
+from .. import TurnBatch
+
+import random
 
 class Turn():
     """Represent an arbitrary Turn with a given face, direction, and
@@ -83,11 +85,22 @@ class Turn():
         return Turn(self.move, self.opposite_direction(), self.depth)
 
     @staticmethod
-    def random_turn(size = 3):
+    def random_turn(size = 3, rng = random):
         """Return a Turn with a random face, direction, and depth
-        less than or equal to half the given cube dimension.
+        less than or equal to half the given cube dimension, drawn from
+        rng, a random.Random or the random module.
         """
-        return Turn(choice(Turn.faces), choice(Turn.directions), randrange(size//2)+1)
+        return Turn(rng.choice(Turn.faces), rng.choice(Turn.directions), rng.randrange(size//2)+1)
+
+    @staticmethod
+    def random_turns(count, moves, size = 3, rng = random):
+        """Return a TurnBatch of count scrambles of moves random Turns
+        each for a cube of the given dimension, drawn from rng. No Turn
+        is on the axis of the one before it, and the first is not on the
+        axis of F.
+        """
+        return TurnBatch(count, moves, Turn, Turn.faces, Turn.directions, range(1, size//2 + 1),
+                         _follow, Turn.faces.index('F'), rng)
 
     def __str__(self):
         """Return this turn using WCA notation."""
@@ -107,3 +120,6 @@ class Turn():
         """
         return 'Turn(move=%s, direction=%s, depth=%s)' % (self.move, self.direction, self.depth)
 
+
+# _follow[f] is the indices of the faces which a Turn of face f may be followed by in a scramble
+_follow = [[g for g, h in enumerate(Turn.faces) if h != f and Turn(h).opposite_face() != f] for f in Turn.faces]
@@ -1,11 +1,23 @@
 from .cube import Cube
+from . import TurnSequence
 
 from queue import Queue
+from random import Random
 from threading import Thread
 
 class ScrambleGenerator():
-    def __init__(self, puzzle = None, random = True, length = None, capacity = 10):
+    def __init__(self, puzzle = None, random = True, length = None, capacity = 10, scramble_filter = None, subset = None, seed = None):
+        """Start generating scrambles of puzzle in a thread. If a seed is
+        given, the puzzle draws them from its own random.Random with that
+        seed, so the same seed gives the same scrambles in the same order.
+        """
         self.puzzle = puzzle if puzzle else Cube(3)
+        if seed is not None:
+            self.puzzle.rng = Random(seed)
+        if scramble_filter is not None:
+            self.puzzle.scramble_filter = scramble_filter
+        if subset is not None:
+            self.puzzle.subset = subset
         self.queue = Queue(max((capacity, 1)))
         self.random = random
         self.length = length
@@ -14,14 +26,16 @@ class ScrambleGenerator():
         self.thread.start()
 
     def enqueue_scramble(self):
-        """Fill a given Queue with scramble until it is either full or a given capacity has been reached"""
+        """Fill a given Queue with scramble until it is either full or a given capacity has been reached.
+        The scrambles wait in the queue as the bytes of TurnSequence.to_bytes.
+        """
         while not self.stopped:
             if not self.queue.full():
-                self.queue.put(self.puzzle.get_scramble(self.random, self.length))
+                self.queue.put(self.puzzle.get_scramble(self.random, self.length).to_bytes())
 
     def __next__(self):
-        """Remove and return the next scramble in the queue"""
-        return self.queue.get()
+        """Remove and return the next scramble in the queue as a TurnSequence"""
+        return TurnSequence.from_bytes(self.queue.get(), self.puzzle.turn_type)
 
     def __enter__(self):
         """Start the scramble generating thread"""
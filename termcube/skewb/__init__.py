@@ -1,11 +1,13 @@
-from .. import TurnSequence
-from random import choice
+from .. import TurnSequence, TurnBatch
+import random
 
 class SkewbTurn():
     faces = ('R', 'U', 'L', 'B')
     axes = ('x', 'y', 'z')
     directions = ('', '2', '\'')
-    moves = faces + axes
+    # D turns the corner between U, L and B. Random turn scrambles leave
+    # it out; the random state scrambles turn it with R, U and L.
+    moves = faces + axes + ('D',)
     lower_faces = [s.lower() for s in faces]
 
     def __init__(self, move, direction = ''):
@@ -19,7 +21,7 @@ class SkewbTurn():
             self.move, self.direction =  move[0], move[1:]
             if self.direction == "2'" or self.direction == "'2":
                 self.direction = '2'
-            if self.move in SkewbTurn.faces and self.direction == '2':
+            if self.move in SkewbTurn.faces + ('D',) and self.direction == '2':
                 self.direction = "'"
 
     def __eq__(self, other):
@@ -43,11 +45,21 @@ class SkewbTurn():
         return SkewbTurn(self.move, self.opposite_direction())
 
     @staticmethod
-    def random_turn():
-        """Return a Turn with a random face, direction, and depth
-        less than or equal to half the given cube dimension.
+    def random_turn(rng = random):
+        """Return a Turn with a random face and direction, drawn from
+        rng, a random.Random or the random module.
         """
-        return SkewbTurn(choice(SkewbTurn.faces), choice(('', "'")))
+        return SkewbTurn(rng.choice(SkewbTurn.faces), rng.choice(('', "'")))
+
+    @staticmethod
+    def random_turns(count, moves, rng = random):
+        """Return a TurnBatch of count scrambles of moves random Turns
+        each, drawn from rng. No Turn is on the face of the one before
+        it or, for U and B, on its opposite face, and the first is not
+        on R.
+        """
+        return TurnBatch(count, moves, lambda face, direction, depth: SkewbTurn(face, direction),
+                         SkewbTurn.faces, ('', "'"), (None,), _follow, SkewbTurn.faces.index('R'), rng)
 
     def __str__(self):
         """Return this turn using WCA notation."""
@@ -59,6 +71,10 @@ class SkewbTurn():
         """
         return 'SkewbTurn(move=%s, direction=%s)' % (self.move, self.direction)
 
+# _follow[f] is the indices of the faces which a SkewbTurn of face f may be followed by in a scramble
+_follow = [[g for g, h in enumerate(SkewbTurn.faces) if h != f and SkewbTurn(h).opposite_face() != f]
+           for f in SkewbTurn.faces]
+
 from . import skewbscramble
 
 class Skewb():
@@ -78,6 +94,10 @@ class Skewb():
 
     turn_type = SkewbTurn
 
+    # Scrambles are drawn from rng. Every Skewb shares this one until it is
+    # given its own, which a seeded random.Random must be.
+    rng = random.Random()
+
     def __init__(self):
         """Initialize a Skewb in a solved state."""
         self.reset()
@@ -98,24 +118,22 @@ class Skewb():
         return s
 
     def get_scramble(self, random = True, moves = None):
-        """Generate and return a scramble without applying."""
+        """Generate and return a scramble without applying, drawn from self.rng."""
         if random:
-            return skewbscramble.scramble()
+            return skewbscramble.scramble(self.rng)
         
         if moves is None or moves <= 0:
             moves = self.default_moves
 
-        ret = TurnSequence()
+        return SkewbTurn.random_turns(1, moves, self.rng)[0]
 
-        last = SkewbTurn('R')
-        turn = SkewbTurn('R')
-
-        for lcv in range(moves if moves else 25):
-            while turn.move == last.move or turn.opposite_face() == last.move:
-                turn = SkewbTurn.random_turn()
-            last = turn
-            ret.append(turn)
-        return ret
+    def get_scrambles(self, count, moves = None):
+        """Generate and return a TurnBatch of count random turn
+        scrambles, drawn from self.rng.
+        """
+        if moves is None or moves <= 0:
+            moves = self.default_moves
+        return SkewbTurn.random_turns(count, moves, self.rng)
 
     def apply(self, sequence):
         """Apply a given TurnSequence to this Skewb. If a str was given,
@@ -191,6 +209,17 @@ class Skewb():
                     self.faces['B'][4], self.faces['L'][3], self.faces['D'][3])
                 (self.faces['U'][1], self.faces['R'][4], self.faces['F'][3]) = \
                     (self.faces['F'][3], self.faces['U'][1], self.faces['R'][4])
+            elif turn.move == 'D':
+                (self.faces['U'][0], self.faces['L'][0], self.faces['B'][0],
+                self.faces['U'][3], self.faces['L'][3], self.faces['B'][1],
+                self.faces['U'][1], self.faces['L'][1], self.faces['B'][2],
+                self.faces['U'][2], self.faces['L'][2], self.faces['B'][4]) = \
+                    (self.faces['B'][0], self.faces['U'][0], self.faces['L'][0],
+                    self.faces['B'][1], self.faces['U'][3], self.faces['L'][3],
+                    self.faces['B'][2], self.faces['U'][1], self.faces['L'][1],
+                    self.faces['B'][4], self.faces['U'][2], self.faces['L'][2])
+                (self.faces['R'][2], self.faces['F'][1], self.faces['D'][3]) = \
+                    (self.faces['D'][3], self.faces['R'][2], self.faces['F'][1])
     def __eq__(self, other):
         """Return true if all stickers match."""
         return self.faces == other.faces
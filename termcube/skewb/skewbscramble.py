@@ -3,7 +3,7 @@
 #~ His source can be found at <https://gist.github.com/cs0x7f/2566010>
 #~ I did not see a license. If this is not okay, please contact me.
 
-from random import randrange
+import random
 from . import SkewbTurn
 from .. import TurnSequence
 
@@ -40,7 +40,7 @@ class SkewbSearch():
 			SkewbSearch.cycle3(ps, 0, 2, 4)
 		elif (m==2):#D
 			SkewbSearch.cycle3(ps, 1, 3, 2)
-		elif (m==3):#B
+		elif (m==3):#U
 			SkewbSearch.cycle3(ps, 3, 5, 4)
 		idx = 0
 		for i in range(0, 4):
@@ -120,20 +120,20 @@ class SkewbSearch():
 					for a in range(0, 2):
 						p = self.centermv[p][m]
 						s = self.cornermv[s][m]
-						sol.append('LRDB'[m]+" '"[a])
+						sol.append('LRDU'[m]+" '"[a])
 						if (self.search(sol, p, s, l-1, m)):
 							return 1
 						sol.pop()
 		return 0
 		
-	def solutionToString(self):
+	def solutionToString(self, rng = random):
 		sol = []
-		cn=randrange(8747)
-		ct=randrange(359)
+		cn=rng.randrange(8747)
+		ct=rng.randrange(359)
 		for l in range(0, 100):
 			if(self.search(sol, ct, cn, l)):
 				break
 		return ' '.join(sol)
 
-def scramble():
-    return TurnSequence(SkewbSearch().solutionToString(), SkewbTurn)
+def scramble(rng = random):
+    return TurnSequence(SkewbSearch().solutionToString(rng), SkewbTurn)
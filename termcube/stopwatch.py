@@ -0,0 +1,44 @@
+'''
+##stopwatch.py
+This module times solves and searches with time.perf_counter_ns. That
+clock is monotonic, so a clock adjustment in the middle of a solve does
+not change its time, and it is the finest clock available. Times are
+kept as integer nanoseconds and only turned into seconds to be shown.
+'''
+
+from time import get_clock_info, perf_counter_ns
+
+def now():
+    """Return the current time in integer nanoseconds, for Stopwatch.stop."""
+    return perf_counter_ns()
+
+class Stopwatch():
+    """Time from when it is made until it is stopped, in integer
+    nanoseconds. The event which stops it, like a key press, may be
+    noticed a little after it happens, so stop takes the time of the
+    event and keeps the delay until the stop as the latency.
+    """
+    # The resolution of the clock in seconds
+    resolution = get_clock_info('perf_counter').resolution
+
+    def __init__(self):
+        self.start = perf_counter_ns()
+        self.end = None
+        self.latency = 0
+
+    def stop(self, at = None):
+        """Stop at the time at, given by now(), or else at once, and
+        return the elapsed nanoseconds.
+        """
+        t = perf_counter_ns()
+        self.end = t if at is None else at
+        self.latency = t - self.end
+        return self.end - self.start
+
+    def elapsed(self):
+        """Return the nanoseconds from the start until the stop, or until now if still running."""
+        return (perf_counter_ns() if self.end is None else self.end) - self.start
+
+    def seconds(self):
+        """Return the elapsed time in seconds."""
+        return self.elapsed() / 1e9
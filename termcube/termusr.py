@@ -14,11 +14,11 @@ from .cube import Cube
 from .scrambler import ScrambleGenerator
 from .simulator import Simulator, addcenter
 from . import TurnSequence
+from .stopwatch import Stopwatch, now
 
 from os.path import isfile
 from sys import exit
-from threading import Thread
-from time import time
+from threading import Event, Thread
 
 try:
     import curses
@@ -112,6 +112,20 @@ def exporttimes(filename, solves):
 
 ###CLI functions
 
+def wait_for_enter():
+    """Start a thread waiting for the enter key. Return an Event that the
+    thread sets once the key is pressed, and a list to which it appends
+    the time of the press, from stopwatch.now, just before.
+    """
+    stop = Event()
+    pressed = []
+    def wait():
+        input()
+        pressed.append(now())
+        stop.set()
+    Thread(target = wait).start()
+    return stop, pressed
+
 def prompt_number(prompt = 'Enter a number: ', default = None, condition = None):
     """Print a given prompt string and return the user's input as a float.
     If invalid or no input, return a given default.
@@ -158,11 +172,28 @@ def prompt_ln(prompt = "Apply which tag(s)?: ", default = None, condition = None
             return default
 
 class Solve():
-    def __init__(self, time, penalty, scramble):
-        self.time = time
+    def __init__(self, ns, penalty, scramble, latency = 0, turn_type = None):
+        """Hold a solve which took ns integer nanoseconds, stopped latency
+        nanoseconds after the key press that ended it. The scramble is
+        kept as the bytes of TurnSequence.to_bytes, which are turned back
+        into Turns of turn_type, a 3x3x3 Turn by default, when asked for.
+        """
+        self.ns = ns
+        self.latency = latency
         self.penalty = penalty
         self.tags = ''
-        self.scramble = scramble
+        self.scramble_bytes = scramble.to_bytes()
+        self.turn_type = turn_type if turn_type else Cube.turn_type
+
+    @property
+    def scramble(self):
+        """The scramble of the solve as a TurnSequence."""
+        return TurnSequence.from_bytes(self.scramble_bytes, self.turn_type)
+
+    @property
+    def time(self):
+        """The time of the solve in seconds."""
+        return self.ns / 1e9
     
     def totaltime(self):
         if self.penalty == 'DNF':
@@ -206,20 +237,23 @@ Available commands:
 -del        - Delete a solve
 -help       - Display this help text"""
 
-    def __init__(self, puzzle = None, inspection = 15, random = True, length = -1):
+    def __init__(self, puzzle = None, inspection = 15, random = True, length = -1, refresh = 0.01):
         self.puzzle = puzzle if puzzle else Cube(3)
         self.inspection = inspection
         self.random = random
         self.length = length
+        self.refresh = refresh
         
         self.solves = []
         self.solvenumber = 1
 
     @staticmethod
-    def count_down(inspection = 15.0):
+    def count_down(inspection = 15.0, refresh = 0.01):
         """Count down a given number of seconds or until interrupted by
         the enter key, then return a penalty corresponding to the time past
-        the allotted inspection time that the timer was stopped.
+        the allotted inspection time that the timer was stopped. The
+        display is redrawn every refresh seconds and the timer sleeps in
+        between.
 
         Seconds over    Penalty
         0               0
@@ -229,18 +263,21 @@ Available commands:
         if inspection <= 0:
             return 0
 
-        stop = []
-        Thread(target = lambda stop : stop.append(input()), args=(stop,)).start()
-        start = time()
-        while not stop:
-            if inspection > time() - start:
-                print('%-3.2f  ' % (inspection - time() + start), end='\r')
-            elif inspection + 2 > time() - start:
+        stop, pressed = wait_for_enter()
+        watch = Stopwatch()
+        while True:
+            elapsed = watch.seconds()
+            if inspection > elapsed:
+                print('%-3.2f  ' % (inspection - elapsed), end='\r')
+            elif inspection + 2 > elapsed:
                 print('%-5s' % '+2', end='\r')
             else:
                 print('%-5s' % 'DNF', end='\r')
+            if stop.wait(refresh):
+                break
 
-        dt = time() - start - inspection
+        watch.stop(pressed[0])
+        dt = watch.seconds() - inspection
 
         if dt <= 0:
             return 0
@@ -250,20 +287,21 @@ Available commands:
             return 'DNF'
 
     @staticmethod
-    def count_up():
+    def count_up(refresh = 0.01):
         """Start a timer counting up until interrupted with enter key.
-        Return the time of the timer.
+        Return the Stopwatch, stopped at the key press. The display is
+        redrawn every refresh seconds and the timer sleeps in between.
         """
-        stop = []
-        Thread(target=(lambda stop:stop.append(input())), args=(stop,)).start()
-        start = time()
-        ret = 0
-        while not stop:
-            ret = time()-start
-            timestr = '%-10s' % formattime(ret)
+        stop, pressed = wait_for_enter()
+        watch = Stopwatch()
+        while True:
+            timestr = '%-10s' % formattime(watch.seconds())
             print(timestr, end='\r')
+            if stop.wait(refresh):
+                break
+        watch.stop(pressed[0])
         print('%-10s' % '\r')
-        return ret
+        return watch
 
     def command(self, command):
         if command == 'exit':
@@ -328,14 +366,14 @@ Available commands:
                     self.command(usr)
                     usr = input()
 
-                penalty = CLITimer.count_down(self.inspection)
-                time = CLITimer.count_up()
+                penalty = CLITimer.count_down(self.inspection, self.refresh)
+                watch = CLITimer.count_up(self.refresh)
 
                 if penalty == 'DNF':
                     print('DNF penalties are ignored')
 
                 self.solvenumber += 1
-                self.solves.append(Solve(time, penalty, scramble))
+                self.solves.append(Solve(watch.elapsed(), penalty, scramble, watch.latency, self.puzzle.turn_type))
                 print()
         return self.solves
 
@@ -422,16 +460,19 @@ Available commands:
                     penalty = 0
 
                 #Solve
-                time = self.countup(self.q)
-                self.solves.append(Solve(time, penalty, scramble))
+                watch = self.countup(self.q)
                 self.q.getch()
                 
-                if time < 0:
+                if watch is None:
                     addcenter(self.q, 'Time deleted')
                     self.q.nodelay(0)
                     self.q.getch()
                     self.q.nodelay(1)
                     continue
+
+                solve = Solve(watch.elapsed(), penalty, scramble, watch.latency, self.puzzle.turn_type)
+                self.solves.append(solve)
+                time = solve.time
                 
                 #Update statistics
                 if self.best == None:
@@ -549,11 +590,11 @@ Available commands:
         maxqy, maxqx = scr.getmaxyx()
 
         ret = 0
-        start = time()
+        watch = Stopwatch()
         c = -1
         while c < 0 or c == curses.KEY_RESIZE:
             scr.clear()
-            delta = inspection + start - time()
+            delta = inspection - watch.seconds()
             if delta > 0:
                 s = '%.2f' % delta
             elif delta > -2:
@@ -572,27 +613,31 @@ Available commands:
         return ret
 
     def countup(self, scr):
+        """Count up until a key is pressed and return the Stopwatch,
+        stopped when the key was read, or None if it was escape.
+        """
         scr.clear()
         maxqy, maxqx = scr.getmaxyx()
 
-        start = time()
+        watch = Stopwatch()
         c = -1
         while True:
             if c == curses.KEY_RESIZE:
                 self.resize()
             elif c == 27:
-                return -1
+                return None
             elif c > 0:
                 break
 
-            total = time() - start
-            s = formattime(total)
+            s = formattime(watch.seconds())
             scr.addstr(maxqy//2 - 1, (maxqx - len(s))//2, s)
             scr.refresh()
             c = scr.getch()
+            pressed = now()
             curses.napms(10)
 
-        return time() - start
+        watch.stop(pressed)
+        return watch
 
     def initialize(self, scr):
         super(CursesTimer, self).initialize(scr)
@@ -630,11 +675,11 @@ Available commands:
             s.refresh()
 
 #Main timer function
-def timer(puzzle = None, inspection = 15, random = True, length = -1, nocurses = False):
+def timer(puzzle = None, inspection = 15, random = True, length = -1, nocurses = False, refresh = 0.01):
     puzzle = puzzle if puzzle else Cube(3)
     #Main application
     if nocurses:
-        solves = CLITimer(puzzle, inspection, random, length).__call__()
+        solves = CLITimer(puzzle, inspection, random, length, refresh).__call__()
     else:
         solves = curses.wrapper(CursesTimer(puzzle, inspection, random, length))
 
@@ -0,0 +1,111 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from termcube.cube.pykociemba import coordcube
+from termcube.cube.pykociemba.coordcube import CoordCube, NibbleTable
+
+
+class NibbleTableTest(unittest.TestCase):
+    """Pack and unpack entries of a NibbleTable, with and without NumPy."""
+
+    def setUp(self):
+        self.numpy = coordcube.numpy
+        self.rng = random.Random(0)
+
+    def tearDown(self):
+        coordcube.numpy = self.numpy
+
+    def values(self, size):
+        return [self.rng.randrange(16) for i in range(size)]
+
+    def test_new_table_is_unfilled(self):
+        for size in (0, 1, 2, 7):
+            table = NibbleTable(size)
+            self.assertEqual(len(table.data), (size + 1) // 2)
+            self.assertEqual([table[i] for i in range(size)], [0x0f] * size)
+
+    def test_set_and_get(self):
+        for size in (1, 2, 15, 1000):
+            values = self.values(size)
+            table = NibbleTable(size)
+            for i, v in enumerate(values):
+                table[i] = v
+            self.assertEqual([table[i] for i in range(size)], values)
+
+    def test_neighbour_is_kept(self):
+        table = NibbleTable(2)
+        table[0] = 3
+        table[1] = 12
+        table[0] = 5
+        self.assertEqual((table[0], table[1]), (5, 12))
+        self.assertEqual(table.data, bytearray([0xc5]))
+
+    def test_many(self):
+        for numpy in (self.numpy, None):
+            coordcube.numpy = numpy
+            size = 1001
+            values = self.values(size)
+            table = NibbleTable(size)
+            for v in range(16):
+                table.set_many([i for i in range(size) if values[i] == v], v)
+            indices = list(range(size))
+            self.rng.shuffle(indices)
+            self.assertEqual([int(v) for v in table.get_many(indices)], [values[i] for i in indices])
+
+    def test_pickle(self):
+        values = self.values(101)
+        table = NibbleTable(101)
+        for i, v in enumerate(values):
+            table[i] = v
+        copy = pickle.loads(pickle.dumps(table))
+        self.assertEqual(len(copy), 101)
+        self.assertEqual([copy[i] for i in range(101)], values)
+
+    def test_unpack(self):
+        for size in (0, 1, 2, 15, 1000):
+            values = self.values(size)
+            table = NibbleTable(size)
+            for i, v in enumerate(values):
+                table[i] = v
+            self.assertEqual(table.unpack(), bytes(values))
+
+
+class CachedTableTest(unittest.TestCase):
+    """Read tables from the cache only if they are what the builder returns."""
+
+    def setUp(self):
+        self.cacheDir = coordcube.cache_dir
+        self.builders = list(coordcube.builders)
+        self.tmp = tempfile.TemporaryDirectory()
+        coordcube.cache_dir = self.tmp.name
+        self.coords = [(CoordCube.N_PARITY, CoordCube.parityMove)]
+
+    def tearDown(self):
+        coordcube.cache_dir = self.cacheDir
+        coordcube.builders[:] = self.builders
+        self.tmp.cleanup()
+
+    def cached(self):
+        with self.assertLogs(coordcube.log, 'INFO'):
+            return coordcube.cachedTable('Parity_Prun', coordcube.pruningTable, self.coords)
+
+    def test_missing_is_built(self):
+        table = self.cached()
+        self.assertIsInstance(table, NibbleTable)
+        self.assertEqual(table.unpack(), b'\x00\x01')
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'Parity_Prun.pkl')))
+
+    def test_stale_is_rebuilt(self):
+        for stale in ([0xff], NibbleTable(3)):
+            coordcube.dump_cachetable(stale, 'Parity_Prun')
+            table = self.cached()
+            self.assertIsInstance(table, NibbleTable)
+            self.assertEqual(table.unpack(), b'\x00\x01')
+            self.assertEqual(coordcube.load_cachetable('Parity_Prun').unpack(), b'\x00\x01')
+
+
+if __name__ == '__main__':
+    unittest.main()
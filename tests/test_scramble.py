@@ -0,0 +1,102 @@
+import random
+import unittest
+from collections import Counter
+from itertools import permutations
+
+from termcube.cube.pykociemba.codec import permutationParity, unrankPieces
+from termcube.cube.pykociemba.coordcube import CoordCube
+from termcube.cube.pykociemba.corner import DBL, DRB
+from termcube.cube.pykociemba.cubiecube import CubieCube
+from termcube.cube.pykociemba.edge import UR, UB, DL, DB, FR
+from termcube.cube.scramble import coordinates, randomcoords, randomPermutation
+
+
+def chiSquare(counts, buckets):
+    """Return the chi-square statistic of counts against a uniform distribution over buckets."""
+    total = sum(counts.values())
+    expected = total / len(buckets)
+    return sum((counts[b] - expected) ** 2 / expected for b in buckets)
+
+
+def chiSquareLimit(df):
+    """Return a bound which a uniform chi-square statistic with df degrees of freedom exceeds about once in 1000."""
+    return df + 4.5 * (2 * df) ** 0.5
+
+
+def toCubieCube(c):
+    """Return the CubieCube of Coordinates, its pieces left out of every coordinate ordered by the parity."""
+    cube = CubieCube()
+    cube.setFlip(c.flip)
+    cube.setTwist(c.twist)
+    cube.setURFtoDLF(c.URFtoDLF)
+    if cube.cornerParity() != c.parity:
+        i, j = cube.cp.index(DBL), cube.cp.index(DRB)
+        cube.cp[i], cube.cp[j] = DRB, DBL
+    ep = unrankPieces(c.FRtoBR // 24, c.FRtoBR % 24, 4, FR, 12, True)
+    for group, lo in ((c.URtoUL, UR), (c.UBtoDF, UB)):
+        for i, e in enumerate(unrankPieces(group // 6, group % 6, 3, lo, 12)):
+            if e is not None:
+                assert ep[i] is None, 'two pieces in one place'
+                ep[i] = e
+    rest = iter((DL, DB))
+    cube.ep[:] = [next(rest) if e is None else e for e in ep]
+    if cube.edgeParity() != c.parity:
+        i, j = cube.ep.index(DL), cube.ep.index(DB)
+        cube.ep[i], cube.ep[j] = DB, DL
+    return cube
+
+
+class RandomPermutationTest(unittest.TestCase):
+
+    def test_parity(self):
+        rng = random.Random(0)
+        for n in (1, 2, 4, 8, 12):
+            for i in range(200):
+                perm, parity = randomPermutation(n, rng)
+                self.assertEqual(sorted(perm), list(range(n)))
+                self.assertEqual(parity, permutationParity(perm))
+
+    def test_uniform(self):
+        rng = random.Random(1)
+        counts = Counter(tuple(randomPermutation(4, rng)[0]) for i in range(24000))
+        buckets = list(permutations(range(4)))
+        self.assertEqual(set(counts), set(buckets))
+        self.assertLess(chiSquare(counts, buckets), chiSquareLimit(len(buckets) - 1))
+
+
+class RandomCoordsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(2)
+        self.coords = [randomcoords(rng) for i in range(20000)]
+
+    def test_ranges(self):
+        for c in self.coords:
+            self.assertTrue(0 <= c.flip < CoordCube.N_FLIP)
+            self.assertTrue(0 <= c.twist < CoordCube.N_TWIST)
+            self.assertIn(c.parity, (0, 1))
+            self.assertTrue(0 <= c.URFtoDLF < CoordCube.N_URFtoDLF)
+            self.assertTrue(0 <= c.FRtoBR < CoordCube.N_FRtoBR)
+            self.assertTrue(0 <= c.URtoUL < CoordCube.N_URtoUL)
+            self.assertTrue(0 <= c.UBtoDF < CoordCube.N_UBtoDF)
+
+    def test_valid_state(self):
+        for c in self.coords[:2000]:
+            cube = toCubieCube(c)
+            self.assertEqual(cube.verify(), 0)
+            self.assertEqual(cube.cornerParity(), cube.edgeParity())
+            self.assertEqual(coordinates(cube), c)
+
+    def test_uniform(self):
+        for name, size in (('parity', 2), ('flip', 64), ('twist', 81), ('URFtoDLF', 720), ('FRtoBR', 24)):
+            counts = Counter(getattr(c, name) % size for c in self.coords)
+            self.assertLess(chiSquare(counts, range(size)), chiSquareLimit(size - 1), name)
+        counts = Counter(c.FRtoBR // 24 for c in self.coords)
+        self.assertLess(chiSquare(counts, range(495)), chiSquareLimit(494), 'FRtoBR places')
+        counts = Counter((c.parity, c.URtoUL % 6, c.UBtoDF % 6) for c in self.coords)
+        buckets = [(p, a, b) for p in (0, 1) for a in range(6) for b in range(6)]
+        self.assertLess(chiSquare(counts, buckets), chiSquareLimit(len(buckets) - 1), 'edge orders and parity')
+
+
+if __name__ == '__main__':
+    unittest.main()
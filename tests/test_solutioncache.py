@@ -0,0 +1,81 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from termcube.cube import Cube, solutioncache
+from termcube.cube.solutioncache import SolutionCache
+
+
+class SolutionCacheTest(unittest.TestCase):
+    """Solve Cubes through a SolutionCache, in any orientation."""
+
+    def solve(self, cache, setup):
+        cube = Cube(3)
+        cube.solution_cache = cache
+        cube.apply(setup)
+        solution, _ = cube.solution()
+        cube.apply(solution)
+        self.assertTrue(cube.is_solved(), setup)
+
+    def test_rotations_hit(self):
+        cache = SolutionCache()
+        setups = ("R U F' L2 D", "y R U F' L2 D", "x2 z R U F' L2 D", "R U F' L2 D y'")
+        for setup in setups:
+            self.solve(cache, setup)
+        self.assertEqual((len(cache), cache.hits, cache.misses), (1, 3, 1))
+
+    def test_no_cache(self):
+        self.solve(None, "R U F' L2 D")
+
+    def test_shared(self):
+        self.assertIs(Cube(3).solution_cache, solutioncache.default)
+        self.assertIs(Cube(3).solution_cache, Cube(3).solution_cache)
+        self.assertIsNone(Cube(4).solution_cache)
+
+
+class BackingFileTest(unittest.TestCase):
+    """Read and write the file behind a SolutionCache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'solutions.pkl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, obj):
+        with open(self.path, 'wb') as f:
+            pickle.dump(obj, f)
+
+    def test_trimmed_on_load(self):
+        self.write(dict(('%02d' % i, ['U']) for i in range(10)))
+        cache = SolutionCache(maxsize = 4, path = self.path)
+        self.assertEqual(list(cache.entries), ['06', '07', '08', '09'])
+
+    def test_wrong_type_ignored(self):
+        for obj in ([1, 2], {'key': 'not a list'}, {3: ['U']}):
+            self.write(obj)
+            with self.assertLogs(solutioncache.log, 'WARNING'):
+                cache = SolutionCache(path = self.path)
+            self.assertEqual(len(cache), 0)
+
+    def test_saved_in_batches_and_on_close(self):
+        cache = SolutionCache(path = self.path, saveEvery = 2)
+        cube = Cube(3)
+        cube.solution_cache = None
+        for setup in ("R", "R U"):
+            cube.reset()
+            cube.apply(setup)
+            cache.put(cube.stickers(), cube.solution()[0])
+        self.assertEqual(len(SolutionCache(path = self.path)), 2)
+        cube.reset()
+        cube.apply("R U F")
+        cache.put(cube.stickers(), cube.solution()[0])
+        self.assertEqual(len(SolutionCache(path = self.path)), 2)
+        cache.close()
+        self.assertEqual(len(SolutionCache(path = self.path)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
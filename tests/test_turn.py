@@ -0,0 +1,121 @@
+import random
+import unittest
+
+from termcube import TurnSequence
+from termcube.cube import Cube
+from termcube.cube.scramble import Scramble
+from termcube.cube.turn import Turn
+from termcube.scrambler import ScrambleGenerator
+from termcube.skewb import Skewb, SkewbTurn
+from termcube.skewb.skewbscramble import SkewbSearch
+from termcube.termusr import Solve
+
+
+class ToBytesTest(unittest.TestCase):
+    """Encode TurnSequences and Scrambles as bytes and decode them again."""
+
+    def assertRoundTrip(self, sequence, turntype):
+        data = sequence.to_bytes()
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(str(TurnSequence.from_bytes(data, turntype)), str(sequence))
+        return data
+
+    def test_notation(self):
+        sequence = TurnSequence("x y' z2 M E' S2 R 2Rw' 3Uw2 Fw", Turn)
+        self.assertRoundTrip(sequence, Turn)
+
+    def test_random_turn_cubes(self):
+        for size in (2, 3, 4, 5, 7, 11):
+            cube = Cube(size)
+            cube.rng = random.Random(size)
+            for sequence in cube.get_scrambles(50):
+                data = self.assertRoundTrip(sequence, Turn)
+                if size <= 5:
+                    self.assertEqual(len(data), len(sequence))
+
+    def test_random_state_cubes(self):
+        for size in (2, 3):
+            cube = Cube(size)
+            cube.rng = random.Random(size)
+            for i in range(3):
+                scramble = cube.get_scramble()
+                data = self.assertRoundTrip(scramble, Turn)
+                self.assertEqual(data, TurnSequence(scramble).to_bytes())
+                self.assertEqual(len(data), len(scramble))
+
+    def test_random_turn_skewb(self):
+        skewb = Skewb()
+        skewb.rng = random.Random(0)
+        for sequence in skewb.get_scrambles(50):
+            self.assertRoundTrip(sequence, SkewbTurn)
+
+    def test_random_state_skewb(self):
+        skewb = Skewb()
+        skewb.rng = random.Random(0)
+        for i in range(20):
+            self.assertRoundTrip(skewb.get_scramble(), SkewbTurn)
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            TurnSequence.from_bytes(b'\x80', Turn)
+
+    def test_scramble_generator(self):
+        with ScrambleGenerator(Skewb(), seed = 1, capacity = 2) as scrambler:
+            scramble = next(scrambler)
+        self.assertIsInstance(scramble, TurnSequence)
+        self.assertTrue(all(isinstance(t, SkewbTurn) for t in scramble))
+
+    def test_solve(self):
+        sequence = TurnSequence("R U' 2Rw2 F", Turn)
+        solve = Solve(12340000000, 0, sequence)
+        self.assertEqual(str(solve.scramble), str(sequence))
+        solve = Solve(1, 0, TurnSequence("R U' D", SkewbTurn), turn_type = SkewbTurn)
+        self.assertEqual(str(solve.scramble), "R U' D")
+
+
+class ScrambleTest(unittest.TestCase):
+
+    def test_equal_and_hash(self):
+        a, b = Scramble(b'\x00\x04'), Scramble(b'\x00\x04')
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len({a, b}), 1)
+        self.assertNotEqual(a, Scramble(b'\x00\x05'))
+        self.assertNotEqual(a, 'U R2')
+        self.assertNotIn('U R2', {a})
+
+
+class SkewbTurnTest(unittest.TestCase):
+    """Turn a Skewb, including the D turns of random state scrambles."""
+
+    def labeled(self):
+        skewb = Skewb()
+        for face in skewb.faces:
+            skewb.faces[face] = [face + str(i) for i in range(5)]
+        return skewb
+
+    def test_d_turn(self):
+        for sequence in ("D D D", "D D'", "D2 D"):
+            self.assertEqual(self.labeled().apply(sequence), self.labeled(), sequence)
+        self.assertNotEqual(self.labeled().apply("D"), self.labeled())
+
+    def test_random_state_solves(self):
+        """The scrambler's moves turn a Skewb as they turn its coordinates."""
+        search, rng = SkewbSearch(), random.Random(0)
+        for i in range(20):
+            skewb, center, corner = Skewb(), 0, 0
+            for j in range(12):
+                m, d = rng.randrange(4), rng.randrange(2)
+                for k in range(d + 1):
+                    center, corner = search.centermv[center][m], search.cornermv[corner][m]
+                skewb.apply_turn(SkewbTurn('LRDU'[m], " '"[d].strip()))
+            solution = []
+            length = 0
+            while not search.search(solution, center, corner, length):
+                length += 1
+            skewb.apply(' '.join(solution))
+            self.assertTrue(skewb.is_solved())
+
+
+if __name__ == '__main__':
+    unittest.main()